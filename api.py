@@ -0,0 +1,112 @@
+import json
+from datetime import datetime
+from flask import Blueprint, Response, abort, jsonify, request, stream_with_context
+from models import Venue, Artist, Show, venue_genre, artist_genre
+from queries import entity_listing, entity_shows, get_with_genres, show_listing, stream_table
+
+#----------------------------------------------------------------------------#
+# Read-only JSON API.
+#----------------------------------------------------------------------------#
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+EXPORTS = {
+    'venues': Venue.__table__,
+    'artists': Artist.__table__,
+    'shows': Show.__table__,
+    'venue_genres': venue_genre,
+    'artist_genres': artist_genre,
+}
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def _serialize(mapping):
+    # jsonify would write datetimes as HTTP dates; keep them ISO 8601 like the exports
+    return dict(
+        (key, json_default(value) if isinstance(value, datetime) else value)
+        for key, value in mapping.items()
+    )
+
+
+def _page_size():
+    return min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+
+
+def _listing(model):
+    rows, next_cursor = entity_listing(model, after=request.args.get('cursor', type=int), per_page=_page_size())
+    return jsonify({
+        "data": [_serialize(row._asdict()) for row in rows],
+        "next_cursor": next_cursor
+    })
+
+
+def _detail(model, entity_id):
+    entity = get_with_genres(model, entity_id)
+    if entity is None:
+        abort(404)
+
+    data = _serialize(dict((column.name, getattr(entity, column.name)) for column in model.__table__.c))
+    data["genres"] = [genre.name for genre in entity.genres]
+    shows = entity_shows(model, entity_id)
+    data.update(shows)
+    data["past_shows"] = [_serialize(show) for show in shows["past_shows"]]
+    data["upcoming_shows"] = [_serialize(show) for show in shows["upcoming_shows"]]
+    return jsonify(data)
+
+
+@api.errorhandler(404)
+def not_found_error(error):
+    return jsonify({"error": "not found"}), 404
+
+
+@api.route('/venues')
+def venues():
+    return _listing(Venue)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return _detail(Venue, venue_id)
+
+
+@api.route('/artists')
+def artists():
+    return _listing(Artist)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return _detail(Artist, artist_id)
+
+
+@api.route('/shows')
+def shows():
+    past = request.args.get('past', 0, type=int) == 1
+    rows, next_cursor = show_listing(past=past, cursor=request.args.get('cursor'), per_page=_page_size())
+    return jsonify({
+        "data": [_serialize(row._asdict()) for row in rows],
+        "next_cursor": next_cursor
+    })
+
+
+@api.route('/export/<name>.ndjson')
+def export(name):
+    # the whole table as newline-delimited JSON, one row per line, streamed
+    # from a server-side cursor
+    table = EXPORTS.get(name)
+    if table is None:
+        abort(404)
+
+    def generate():
+        for row in stream_table(table):
+            yield json.dumps(dict(row), default=json_default) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
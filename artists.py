@@ -0,0 +1,186 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app
+from cache import conditional
+from extensions import db, page_cache, query_stats, async_db
+from forms import ArtistForm
+from models import Artist, artist_genre, utcnow
+from queries import artist_names, search_results, get_with_genres, entity_shows, show_partner_ids, page_validators
+from genres import choice_ids, add_genres, set_genres
+import async_queries
+
+#----------------------------------------------------------------------------#
+# Artist pages.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('artists', __name__)
+
+#  Artists
+#  ----------------------------------------------------------------
+@blueprint.route('/artists')
+@query_stats.budget(1)
+@page_cache.cached
+def artists():
+  if async_db.enabled:
+    data = async_db.run(async_queries.artist_names())
+  else:
+    data = artist_names()
+
+  return render_template('pages/artists.html', artists=data)
+
+@blueprint.route('/artists/search', methods=['POST'])
+@query_stats.budget(2)
+def search_artists():
+  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  
+  search_str = request.form.get('search_term', '')
+  page = request.values.get('page', 1, type=int)
+  response = search_results(Artist, search_str, page=page)
+
+  return render_template('pages/search_artists.html', results=response, search_term=search_str)
+
+@blueprint.route('/artists/<int:artist_id>')
+@query_stats.budget(6)
+@conditional(lambda artist_id: page_validators(Artist, artist_id))
+@page_cache.cached
+def show_artist(artist_id):
+  # shows the venue page with the given venue_id
+  # TODO: replace with real venue data from the venues table, using venue_id  
+  if async_db.enabled:
+    artist, genres, shows = async_db.run(async_queries.entity_page(Artist, artist_id))
+  else:
+    artist = get_with_genres(Artist, artist_id)
+    if artist:
+      genres = [genre.name for genre in artist.genres]
+      shows = entity_shows(Artist, artist.id)
+  data = {}
+  if artist:
+    data = {
+      "id": artist.id,
+      "name": artist.name,
+      "genres": genres,
+      "city": artist.city,
+      "state": artist.state,
+      "phone": artist.phone,
+      "website": artist.website,
+      "facebook_link": artist.facebook_link,
+      "seeking_venue": True if artist.seeking_venue else False,
+      "seeking_description": artist.seeking_description,
+      "image_link": artist.image_link,
+      **shows
+    }
+ 
+  return render_template('pages/show_artist.html', artist=data)
+
+#  Update
+#  ----------------------------------------------------------------
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  form = ArtistForm()
+  artist = Artist.query.get(artist_id)
+
+  if artist:
+    form.name.data = artist.name
+    form.city.data = artist.city
+    form.state.data = artist.state
+    form.phone.data = artist.phone
+    form.image_link.data = artist.image_link
+    form.genres.data = [genre.id for genre in artist.genres]
+    form.facebook_link.data = artist.facebook_link
+    form.website.data = artist.website
+    form.seeking_venue.data = artist.seeking_venue
+    form.seeking_description.data = artist.seeking_description
+
+  # TODO: populate form with fields from artist with ID <artist_id>
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  # TODO: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attributes
+  form = ArtistForm(request.form)
+  artist = Artist.query.get(artist_id)
+
+  if artist:
+    genre_ids = choice_ids(form.genres.data)
+    artist.name = form.name.data
+    artist.city = form.city.data
+    artist.phone = form.phone.data
+    artist.state = form.state.data
+    artist.image_link = form.image_link.data
+    artist.facebook_link = form.facebook_link.data
+    artist.website = form.website.data
+    artist.seeking_venue = True if form.seeking_venue.data else False
+    artist.seeking_description = form.seeking_description.data
+
+    # only insert/delete the artist_genre rows that changed, and skip the
+    # UPDATE and commit entirely when the save changes nothing
+    artist_changed = db.session.is_modified(artist)
+    if set_genres(artist_genre, artist.id, genre_ids) or artist_changed:
+      # genre changes alone don't trigger onupdate
+      artist.updated_at = utcnow()
+      db.session.commit()
+      page_cache.invalidate(
+        url_for('artists.artists'),
+        url_for('artists.show_artist', artist_id=artist_id),
+        url_for('shows.shows'),
+        *[url_for('venues.show_venue', venue_id=id) for id in show_partner_ids(Artist, artist_id)]
+      )
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@blueprint.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  # called upon submitting the new artist listing form
+  # TODO: insert form data as a new Venue record in the db, instead
+  # TODO: modify data to be the data object returned from db insertion
+  form = ArtistForm(request.form)
+  error = False
+  
+  artist = Artist(
+      name = form.name.data,
+      city = form.city.data,
+      state = form.state.data,
+      phone = form.phone.data,
+      image_link = form.image_link.data,
+      facebook_link = form.facebook_link.data,
+      website = form.website.data,
+      seeking_venue = True if form.seeking_venue.data else False,
+      seeking_description = form.seeking_description.data
+    )
+
+  try:
+    genre_ids = choice_ids(form.genres.data)
+    db.session.add(artist)
+    db.session.flush()
+
+    add_genres(artist_genre, artist.id, genre_ids)
+    current_app.logger.debug('artist %s genres %s', artist.id, genre_ids)
+    
+    db.session.commit()
+      
+  except Exception:
+    db.session.rollback()
+    error = True
+    current_app.logger.exception('Artist %s could not be listed', form.name.data)
+  finally:
+    db.session.close()
+  # on successful db insert, flash success
+  # flash('Artist ' + request.form['name'] + ' was successfully listed!')
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+
+  if error:
+    flash('An error occurred. Artist ' + form.name.data + ' could not be listed.')
+  else:
+    page_cache.invalidate(url_for('artists.artists'))
+    flash('Artist ' + request.form['name'] + ' was successfully listed!')
+
+  return render_template('pages/home.html')
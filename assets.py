@@ -0,0 +1,170 @@
+import gzip, hashlib, json, mimetypes, os, re, shutil
+from flask import abort, current_app, request, send_from_directory, url_for
+
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#----------------------------------------------------------------------------#
+
+# `flask fyyur build-assets` concatenates and minifies each bundle into
+# static/dist/<name>.<hash>.<ext>, next to .gz (and, with the brotli package,
+# .br) copies, and records the names in static/dist/manifest.json. pages link
+# the hashed files through asset_urls(); a changed file gets a new name, so
+# they are served as immutable and never revalidated. without a build (or
+# with ASSETS_DEBUG) asset_urls() falls back to the source files.
+#
+# rcssmin/rjsmin are used for minifying when installed; otherwise CSS goes
+# through a conservative whitespace/comment stripper and JS is left as is
+# (the large libraries are minified already).
+
+BUNDLES = {
+    'main.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # loaded synchronously in <head>
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # loaded with defer at the end of <body>
+    'main.js': [
+        'js/libs/jquery-1.11.1.min.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+        'js/script.js',
+    ],
+}
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# source map comments would point at files that aren't part of the bundle
+SOURCE_MAP = re.compile(r'^\s*//[#@] sourceMappingURL=.*$', re.MULTILINE)
+
+
+def _minify_css(text):
+    try:
+        import rcssmin
+        return rcssmin.cssmin(text)
+    except ImportError:
+        pass
+    text = re.sub(r'/\*(?!!).*?\*/', '', text, flags=re.DOTALL)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def _minify_js(text):
+    text = SOURCE_MAP.sub('', text)
+    try:
+        import rjsmin
+        return rjsmin.jsmin(text)
+    except ImportError:
+        return text
+
+
+def build_bundle(static_folder, name, sources):
+    # returns the bundle's contents, minified
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            parts.append(f.read())
+    if name.endswith('.css'):
+        return '\n'.join(_minify_css(part) for part in parts)
+    # a library without a trailing semicolon mustn't run into the next one
+    return '\n;\n'.join(_minify_js(part) for part in parts)
+
+
+def _precompress(path, data):
+    # gzip with a fixed mtime, so rebuilding unchanged sources gives identical files
+    with open(path + '.gz', 'wb') as f:
+        with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=9, mtime=0) as gz:
+            gz.write(data)
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def build(static_folder, bundles=BUNDLES, clean=False):
+    # writes every bundle to static/dist and returns the manifest, {bundle
+    # name: file name}. files from earlier builds are kept unless `clean`, for
+    # pages still in a cache or a browser that link to them.
+    dist = os.path.join(static_folder, DIST)
+    if clean:
+        shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist, exist_ok=True)
+
+    manifest = {}
+    for name, sources in bundles.items():
+        data = build_bundle(static_folder, name, sources).encode('utf-8')
+        stem, ext = os.path.splitext(name)
+        filename = '{}.{}{}'.format(stem, hashlib.sha256(data).hexdigest()[:12], ext)
+        path = os.path.join(dist, filename)
+        with open(path, 'wb') as f:
+            f.write(data)
+        _precompress(path, data)
+        manifest[name] = filename
+
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(dist):
+    # {bundle name: file name} from the last build, or {} without one
+    try:
+        with open(os.path.join(dist, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class Assets(object):
+    # adds asset_urls(bundle) to templates and serves /static/dist with
+    # long-lived caching, picking the brotli or gzip copy the client accepts.
+    # each app's manifest is kept in app.extensions['assets'].
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        manifest = {}
+        if not app.config.get('ASSETS_DEBUG'):
+            manifest = load_manifest(os.path.join(app.static_folder, DIST))
+        app.extensions['assets'] = manifest
+
+        app.add_url_rule(app.static_url_path + '/' + DIST + '/<path:filename>', 'asset', self.serve)
+        app.jinja_env.globals['asset_urls'] = self.urls
+
+    def urls(self, name):
+        # URLs to include for a bundle: the built file, or its sources
+        filename = current_app.extensions['assets'].get(name)
+        if filename is not None:
+            return [url_for('asset', filename=filename)]
+        return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+    def serve(self, filename):
+        if filename == MANIFEST:
+            abort(404)
+
+        dist = os.path.join(current_app.static_folder, DIST)
+        mimetype = mimetypes.guess_type(filename)[0]
+        accepted = request.accept_encodings
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[encoding] and os.path.exists(os.path.join(dist, filename + suffix)):
+                response = send_from_directory(dist, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(dist, filename, mimetype=mimetype)
+
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,41 @@
+import asyncio
+from extensions import async_db
+from queries import (
+    venue_areas_statement, group_areas, artist_names_statement, show_listing_statement, show_page,
+    entity_statement, genre_names_statement, entity_show_statements, shows_result,
+    SHOWS_PAGE_SIZE, PAST_SHOWS_LIMIT
+)
+
+#----------------------------------------------------------------------------#
+# Async reads.
+#----------------------------------------------------------------------------#
+
+# the read paths of queries.py on the async engine (see asyncdb.py), built
+# from the same statements and returning the same shapes. run them with
+# async_db.run().
+
+async def venue_areas():
+    return group_areas(await async_db.all(venue_areas_statement()))
+
+async def artist_names():
+    return [row._asdict() for row in await async_db.all(artist_names_statement())]
+
+async def show_listing(past=False, cursor=None, per_page=SHOWS_PAGE_SIZE, now=None):
+    rows = await async_db.all(show_listing_statement(past, cursor, per_page, now))
+    return show_page(rows, per_page)
+
+async def entity_page(model, entity_id, past_limit=PAST_SHOWS_LIMIT, now=None):
+    # (row, genre names, shows) for a venue or artist page, or (None, [], {})
+    # for an unknown id. the entity, its genres, its show counts and both show
+    # lists are fetched at the same time.
+    counts, upcoming, past = entity_show_statements(model, entity_id, past_limit, now)
+    entity, genres, counts, upcoming_shows, past_shows = await asyncio.gather(
+        async_db.first(entity_statement(model, entity_id)),
+        async_db.all(genre_names_statement(model, entity_id)),
+        async_db.one(counts),
+        async_db.all(upcoming),
+        async_db.all(past)
+    )
+    if entity is None:
+        return None, [], {}
+    return entity, [row.name for row in genres], shows_result(counts, upcoming_shows, past_shows)
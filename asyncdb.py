@@ -0,0 +1,94 @@
+import asyncio, os, threading
+from flask import current_app
+from dbpool import async_database_url
+
+#----------------------------------------------------------------------------#
+# Async read engine.
+#----------------------------------------------------------------------------#
+
+# with ASYNC_READS the read-heavy pages hand their queries to an asyncio
+# engine running on one event loop per worker process, and the request thread
+# waits for the result. a page's independent queries run concurrently, each
+# on its own connection, so the page waits for the slowest query instead of
+# the sum of all of them, and a worker thread spends no time between round
+# trips.
+#
+# Flask's own `async def` views aren't used for this: each of them runs in a
+# fresh event loop, which still occupies the worker thread, and asyncpg
+# connections can't be shared between loops, so every request would open new
+# connections.
+#
+# the loop and engine are created on first use in each process, so gunicorn
+# workers forked from a preloading master get their own. coroutines run in a
+# copy of the caller's context, so request-scoped state (flask.g, the query
+# stats) works inside them.
+
+
+class AsyncEngine(object):
+    # one app's async engine and the event loop it runs on, started on first
+    # use in each process
+
+    def __init__(self, enabled, url, options):
+        self.enabled = enabled
+        self.url = url
+        self.options = options
+        self.engine = None
+        self.loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name='async-db', daemon=True).start()
+        self.engine = create_async_engine(self.url, **self.options)
+        self.loop = loop
+        self._pid = os.getpid()
+
+    def run(self, coroutine):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+
+class AsyncDB(object):
+    # the app's AsyncEngine is kept in app.extensions['async_db'], so apps
+    # built with different configs each get their own
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['async_db'] = AsyncEngine(
+            app.config.get('ASYNC_READS', False),
+            app.config.get('ASYNC_DATABASE_URI') or async_database_url(app.config['SQLALCHEMY_DATABASE_URI']),
+            app.config.get('ASYNC_ENGINE_OPTIONS', {})
+        )
+
+    @property
+    def state(self):
+        return current_app.extensions['async_db']
+
+    @property
+    def enabled(self):
+        return self.state.enabled
+
+    def run(self, coroutine):
+        # runs `coroutine` on the app's event loop and returns its result
+        return self.state.run(coroutine)
+
+    async def all(self, statement):
+        # every row of `statement`, on a connection of its own
+        async with self.state.engine.connect() as connection:
+            return (await connection.execute(statement)).all()
+
+    async def first(self, statement):
+        async with self.state.engine.connect() as connection:
+            return (await connection.execute(statement)).first()
+
+    async def one(self, statement):
+        async with self.state.engine.connect() as connection:
+            return (await connection.execute(statement)).one()
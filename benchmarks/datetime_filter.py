@@ -0,0 +1,62 @@
+#----------------------------------------------------------------------------#
+# Per-row cost of the `datetime` Jinja filter, as used by shows.html and the
+# venue/artist pages.
+#
+#   python -m benchmarks.datetime_filter
+#
+# "before" is the old path: the handler strftime()s the show time, the filter
+# parses it back with dateutil and formats it with babel. "after" passes the
+# datetime straight to the filter.
+#----------------------------------------------------------------------------#
+
+import argparse, random, timeit
+from datetime import datetime, timedelta
+import babel.dates
+import dateutil.parser
+
+
+def old_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--distinct', type=int, default=100, help='distinct show times among the rows')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    from filters import format_datetime, cached_format_datetime
+
+    rng = random.Random(0)
+    now = datetime.now().replace(microsecond=0)
+    times = [now + timedelta(hours=rng.randint(-5000, 5000)) for _ in range(args.distinct)]
+    rows = [rng.choice(times) for _ in range(args.rows)]
+
+    def before():
+        for start_time in rows:
+            old_format_datetime(start_time.strftime('%Y-%m-%d %H:%M:%S'), 'full')
+
+    def after():
+        for start_time in rows:
+            format_datetime(start_time, 'full')
+
+    def after_cold():
+        cached_format_datetime.cache_clear()
+        after()
+
+    for value in times:
+        assert old_format_datetime(value.strftime('%Y-%m-%d %H:%M:%S'), 'full') == format_datetime(value, 'full')
+
+    for name, run in (('before', before), ('after (cold memo)', after_cold), ('after (warm memo)', after)):
+        best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print('{:<18} {:8.2f} us/row'.format(name, best / args.rows * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#----------------------------------------------------------------------------#
+# Compares the query plans of the page routes with and without the show and
+# genre association indexes (migration 9b2e6f4d1a57).
+#
+#   python -m benchmarks.explain_indexes --database-url postgresql://localhost/fyyur_bench
+#
+# The target database is dropped and reseeded. On Postgres each statement is
+# run through EXPLAIN ANALYZE; on SQLite through EXPLAIN QUERY PLAN.
+#----------------------------------------------------------------------------#
+
+import argparse, os, tempfile, time
+
+INDEXES = [
+    'ix_show_venue_id_start_time',
+    'ix_show_artist_id_start_time',
+    'ix_show_start_time_id',
+    'ix_venue_genre_genre_id_venue_id',
+    'ix_artist_genre_genre_id_artist_id',
+]
+
+ROUTES = [
+    ('GET', '/venues', None),
+    ('GET', '/venues/1', None),
+    ('GET', '/artists/1', None),
+    ('GET', '/shows', None),
+    ('GET', '/shows?past=1', None),
+    ('POST', '/venues/search', {'search_term': 'hop'}),
+    ('POST', '/artists/search', {'search_term': 'band'}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', default='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    parser.add_argument('--venues', type=int, default=2000)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=200000)
+    args = parser.parse_args()
+
+    # the app reads its database from the environment at import time
+    os.environ['DATABASE_URL'] = args.database_url
+    from sqlalchemy import event
+    from app import create_app
+    from extensions import db
+    app = create_app()
+    from benchmarks.seed import seed
+
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+        with db.engine.begin() as connection:
+            seed(connection, venues=args.venues, artists=args.artists, shows=args.shows)
+
+        indexes = [
+            index
+            for table in db.metadata.tables.values()
+            for index in table.indexes
+            if index.name in INDEXES
+        ]
+
+        captured = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+        event.listen(db.engine, 'before_cursor_execute', capture)
+
+        client = app.test_client()
+        for phase in ('before', 'after'):
+            with db.engine.begin() as connection:
+                for index in indexes:
+                    if phase == 'before':
+                        index.drop(connection, checkfirst=True)
+                    else:
+                        index.create(connection, checkfirst=True)
+                connection.exec_driver_sql('ANALYZE')
+
+            print('=' * 78)
+            print('{} indexes'.format(phase.upper()))
+            print('=' * 78)
+            for method, path, data in ROUTES:
+                del captured[:]
+                started = time.perf_counter()
+                client.open(path, method=method, data=data)
+                elapsed = time.perf_counter() - started
+                statements = list(captured)
+
+                print('\n{} {}  {:.1f} ms, {} statements'.format(method, path, elapsed * 1000, len(statements)))
+                event.remove(db.engine, 'before_cursor_execute', capture)
+                with db.engine.connect() as connection:
+                    for statement, parameters in statements:
+                        prefix = 'EXPLAIN ANALYZE ' if db.engine.dialect.name == 'postgresql' else 'EXPLAIN QUERY PLAN '
+                        plan = connection.exec_driver_sql(prefix + statement, parameters).fetchall()
+                        print('  ' + ' '.join(statement.split())[:120])
+                        for row in plan:
+                            print('    ' + str(row[-1]))
+                event.listen(db.engine, 'before_cursor_execute', capture)
+
+
+if __name__ == '__main__':
+    main()
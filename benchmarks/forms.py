@@ -0,0 +1,87 @@
+#----------------------------------------------------------------------------#
+# What building, validating and rendering a form costs per request.
+#
+#   python -m benchmarks.forms
+#   python -m benchmarks.forms --path /tmp/fyyur-old       # another checkout
+#
+# Each case runs in a request context on an empty SQLite schema, without
+# touching the database for the form itself. Timings are the median of
+# --repeat rounds of --number calls, in microseconds per call.
+#----------------------------------------------------------------------------#
+
+import argparse, os, statistics, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def median_us(call, number, repeat):
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            call()
+        rounds.append((time.perf_counter() - started) / number)
+    return statistics.median(rounds) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--path', default=ROOT, help='Checkout to measure.')
+    parser.add_argument('--number', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    # the app reads its database from the environment at import time
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'forms.db')
+    sys.path.insert(0, args.path)
+    from app import create_app
+    from extensions import db
+    from forms import VenueForm, ArtistForm, ShowForm
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+
+    def posted(form_class):
+        # a valid submission: the first state and genre the form offers
+        with app.test_request_context():
+            form = form_class()
+            return {
+                'name': 'The Benchmark Hall', 'city': 'Springfield', 'address': '1 Main St',
+                'phone': '555-000-0000', 'facebook_link': 'https://www.facebook.com/benchmark',
+                'state': form.state.choices[0][0], 'genres': str(form.genres.choices[0][0]),
+            }
+
+    def build(form_class):
+        return form_class
+
+    def render(form_class):
+        def call():
+            form = form_class()
+            return form.state(), form.genres()
+        return call
+
+    def validate(form_class):
+        def call():
+            assert form_class().validate(), form_class().errors
+        return call
+
+    cases = [
+        ('VenueForm()', 'GET', None, build(VenueForm)),
+        ('ArtistForm()', 'GET', None, build(ArtistForm)),
+        ('ShowForm()', 'GET', None, build(ShowForm)),
+        ('VenueForm render', 'GET', None, render(VenueForm)),
+        ('ArtistForm render', 'GET', None, render(ArtistForm)),
+        ('VenueForm validate', 'POST', posted(VenueForm), validate(VenueForm)),
+        ('ArtistForm validate', 'POST', posted(ArtistForm), validate(ArtistForm)),
+    ]
+
+    print('{} ({} x {}, median)'.format(args.path, args.repeat, args.number))
+    for name, method, data, call in cases:
+        with app.test_request_context(method=method, data=data):
+            call()
+            print('  {:<22} {:>8.1f} us'.format(name, median_us(call, args.number, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
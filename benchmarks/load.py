@@ -0,0 +1,173 @@
+#----------------------------------------------------------------------------#
+# Read throughput of one worker, with and without ASYNC_READS.
+#
+#   python -m benchmarks.load                          # SQLite file, both modes
+#   python -m benchmarks.load --database-url postgresql://localhost/fyyur_bench
+#   python -m benchmarks.load --modes async --concurrency 32 --duration 30
+#
+# The target database is dropped and reseeded (see benchmarks/seed.py). For
+# each mode, one server process stands in for a gunicorn worker: it serves
+# the venue, artist and show listings and the busiest/quietest venue and
+# artist pages on a threaded server, with the page cache off. --concurrency
+# clients keep it busy for --duration seconds, each request on a new
+# connection, and the requests per second and latencies are compared.
+#
+# The async mode needs the database's asyncio driver: asyncpg for Postgres,
+# aiosqlite for SQLite.
+#----------------------------------------------------------------------------#
+
+import argparse, itertools, json, logging, os, subprocess, sys, tempfile, threading, time
+from urllib.error import URLError
+from urllib.request import urlopen
+from benchmarks.seed import add_arguments, reset_and_seed
+from benchmarks.routes import percentile
+
+PATHS = [
+    '/venues',
+    '/artists',
+    '/shows',
+    '/shows?past=1',
+    '/venues/{busiest_venue_id}',
+    '/venues/{quietest_venue_id}',
+    '/artists/{busiest_artist_id}',
+    '/artists/{quietest_artist_id}',
+]
+
+
+def serve(port):
+    # runs in the server process, configured through the environment
+    from werkzeug.serving import make_server
+    from app import create_app
+    app = create_app(cli=False)
+    app.logger.setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    # under full load many statements pass SLOW_QUERY_MS; keep them off the output
+    logging.getLogger('fyyur.slow_query').setLevel(logging.ERROR)
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def start_server(database_url, port, async_reads):
+    env = dict(os.environ, DATABASE_URL=database_url, PAGE_CACHE_TYPE='null',
+               ASYNC_READS='1' if async_reads else '0')
+    server = subprocess.Popen(
+        [sys.executable, '-W', 'ignore', '-m', 'benchmarks.load', '--serve', str(port)],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urlopen('http://127.0.0.1:{}/'.format(port)).read()
+            return server
+        except URLError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('server on port {} did not start'.format(port))
+
+
+def drive(base, paths, concurrency, duration):
+    # {path: [latency, ...]} and the number of failed requests. each client
+    # walks the paths from its own offset, so every path sees the same load.
+    latencies = dict((path, []) for path in paths)
+    errors = []
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        for path in itertools.islice(itertools.cycle(paths), offset, None):
+            if time.monotonic() >= deadline:
+                return
+            started = time.perf_counter()
+            try:
+                urlopen(base + path).read()
+            except (URLError, OSError) as error:
+                errors.append(error)
+                continue
+            latencies[path].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(i % len(paths),)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(errors)
+
+
+def run_mode(mode, args, paths):
+    server = start_server(args.database_url, args.port, mode == 'async')
+    base = 'http://127.0.0.1:{}'.format(args.port)
+    try:
+        # warm the pools, template cache and, in async mode, the event loop
+        drive(base, paths, args.concurrency, min(2, args.duration))
+        latencies, errors = drive(base, paths, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "requests_per_second": round(total / args.duration, 1),
+        "errors": errors,
+        "routes": dict(
+            (path, {
+                "requests": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+            })
+            for path, values in latencies.items()
+        ),
+    }
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--serve':
+        return serve(int(sys.argv[2]))
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', default='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load.db'))
+    add_arguments(parser)
+    parser.add_argument('--modes', nargs='+', choices=('sync', 'async'), default=['sync', 'async'])
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients.')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per mode.')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--json', help='Also write the results to this file.')
+    args = parser.parse_args()
+
+    # the app reads its database from the environment at import time
+    os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app
+    from extensions import db
+    app = create_app()
+    with app.app_context():
+        targets = reset_and_seed(db, args)
+        dialect = db.engine.dialect.name
+        db.session.remove()
+        db.engine.dispose()
+    paths = [path.format(**targets) for path in PATHS]
+
+    print('{}: {venue} venues, {artist} artists, {show} shows; {} clients, {}s per mode'.format(
+        dialect, args.concurrency, args.duration, **targets))
+
+    results = {}
+    for mode in args.modes:
+        results[mode] = run_mode(mode, args, paths)
+
+    print('{:<22}'.format('route') + ''.join('{:>26}'.format(mode + ' p50/p95 ms') for mode in args.modes))
+    for path in paths:
+        print('{:<22}'.format(path) + ''.join(
+            '{:>26}'.format('{p50_ms:.1f} / {p95_ms:.1f}'.format(**results[mode]['routes'][path]))
+            for mode in args.modes
+        ))
+    print('{:<22}'.format('requests/s') + ''.join(
+        '{:>26}'.format(results[mode]['requests_per_second']) for mode in args.modes
+    ))
+    print('{:<22}'.format('errors') + ''.join('{:>26}'.format(results[mode]['errors']) for mode in args.modes))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"dialect": dialect, "concurrency": args.concurrency, "results": results}, f, indent=2)
+            f.write('\n')
+    if any(results[mode]['errors'] for mode in args.modes):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
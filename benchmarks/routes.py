@@ -0,0 +1,233 @@
+#----------------------------------------------------------------------------#
+# Latency and query counts for every route, through the Flask test client.
+#
+#   python -m benchmarks.routes                        # SQLite, compare to baseline
+#   python -m benchmarks.routes --database-url postgresql://localhost/fyyur_bench
+#   python -m benchmarks.routes --save-baseline        # record a new baseline
+#
+# The target database is dropped and reseeded with skewed data (see
+# benchmarks/seed.py), so detail pages are measured for both the busiest and
+# the quietest venue/artist. The page cache is disabled unless --page-cache
+# is given, so each request runs its view.
+#
+# A route regresses when it runs more statements than in the baseline, or
+# when its p50 is more than --tolerance slower (and at least --min-delta-ms,
+# to ignore noise on fast routes). p95 is reported but not compared; over a
+# few dozen requests it mostly measures the machine. Latency baselines only
+# mean something on the machine that recorded them, query counts anywhere.
+# The exit status is 1 on any regression.
+#----------------------------------------------------------------------------#
+
+import argparse, json, logging, os, re, sys, tempfile, time
+from urllib.parse import quote
+from benchmarks.seed import add_arguments, reset_and_seed
+from vocabulary import GENRES
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# the forms submit genre ids; seed() numbers the genres in vocabulary order
+BENCHMARK_GENRES = [str(GENRES.index(name) + 1) for name in ('Jazz', 'Folk')]
+
+VENUE_FORM = {
+    'name': 'The Benchmark Hall', 'city': 'Springfield', 'state': 'CA',
+    'address': '1 Main St', 'phone': '555-000-0000', 'genres': BENCHMARK_GENRES,
+    'facebook_link': 'https://www.facebook.com/benchmark',
+}
+ARTIST_FORM = {
+    'name': 'The Benchmark Band', 'city': 'Springfield', 'state': 'CA',
+    'phone': '555-000-0000', 'genres': BENCHMARK_GENRES,
+    'facebook_link': 'https://www.facebook.com/benchmark',
+}
+
+# (name, method, path, form data). paths are formatted with the ids returned
+# by seed(), the second page /shows cursor and, for the delete, a different
+# venue on every request. reads come first so that the rows the writes add don't affect them.
+CASES = [
+    ('home', 'GET', '/', None),
+    ('venues', 'GET', '/venues', None),
+    ('venue busiest', 'GET', '/venues/{busiest_venue_id}', None),
+    ('venue quietest', 'GET', '/venues/{quietest_venue_id}', None),
+    ('venue search', 'POST', '/venues/search', {'search_term': 'hop'}),
+    ('artists', 'GET', '/artists', None),
+    ('artist busiest', 'GET', '/artists/{busiest_artist_id}', None),
+    ('artist quietest', 'GET', '/artists/{quietest_artist_id}', None),
+    ('artist search', 'POST', '/artists/search', {'search_term': 'band'}),
+    ('shows', 'GET', '/shows', None),
+    ('shows past', 'GET', '/shows?past=1', None),
+    ('shows page 2', 'GET', '/shows?cursor={shows_cursor}', None),
+    ('venue create form', 'GET', '/venues/create', None),
+    ('artist create form', 'GET', '/artists/create', None),
+    ('show create form', 'GET', '/shows/create', None),
+    ('venue edit form', 'GET', '/venues/{busiest_venue_id}/edit', None),
+    ('artist edit form', 'GET', '/artists/{busiest_artist_id}/edit', None),
+    ('db pool stats', 'GET', '/internal/db-pool', None),
+    ('api venues', 'GET', '/api/v1/venues', None),
+    ('api venue', 'GET', '/api/v1/venues/{busiest_venue_id}', None),
+    ('api artists', 'GET', '/api/v1/artists', None),
+    ('api artist', 'GET', '/api/v1/artists/{busiest_artist_id}', None),
+    ('api shows', 'GET', '/api/v1/shows', None),
+    ('api export genres', 'GET', '/api/v1/export/venue_genres.ndjson', None),
+    ('venue edit', 'POST', '/venues/{quietest_venue_id}/edit', VENUE_FORM),
+    ('artist edit', 'POST', '/artists/{quietest_artist_id}/edit', ARTIST_FORM),
+    ('venue create', 'POST', '/venues/create', VENUE_FORM),
+    ('artist create', 'POST', '/artists/create', ARTIST_FORM),
+    ('show create', 'POST', '/shows/create', {
+        'venue_id': '{quietest_venue_id}', 'artist_id': '{quietest_artist_id}',
+        'start_time': '2030-01-01 20:00:00',
+    }),
+    ('venue delete', 'DELETE', '/venues/{delete_venue_id}', None),
+]
+
+
+def percentile(samples, pct):
+    # nearest-rank percentile of a non-empty list
+    ordered = sorted(samples)
+    return ordered[max(0, -(-len(ordered) * pct // 100) - 1)]
+
+
+def _format(value, targets):
+    if isinstance(value, str):
+        return value.format_map(targets)
+    if isinstance(value, list):
+        return [_format(item, targets) for item in value]
+    return dict((key, _format(item, targets)) for key, item in value.items())
+
+
+def run_case(client, method, path, data, targets, requests, warmup):
+    # returns (latencies in ms, statements per request, last status code).
+    # streamed responses run their queries after X-DB-Queries is set, so
+    # their count only covers the statements made before streaming.
+    latencies, queries, status = [], 0, None
+    for i in range(warmup + requests):
+        targets = dict(targets, delete_venue_id=targets['delete_venue_ids'][i])
+        started = time.perf_counter()
+        response = client.open(_format(path, targets), method=method, data=data and _format(data, targets))
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        status = response.status_code
+        if i >= warmup:
+            latencies.append(elapsed * 1000)
+            queries = max(queries, int(response.headers.get('X-DB-Queries', 0)))
+    return latencies, queries, status
+
+
+def uncovered_routes(app):
+    # url rules no case exercises, so new routes don't go unmeasured
+    adapter = app.url_map.bind('localhost')
+    covered = set()
+    for _, method, path, _ in CASES:
+        try:
+            endpoint, _ = adapter.match(re.sub(r'{[^}]*}', '1', path.split('?')[0]), method=method)
+        except Exception:
+            continue
+        covered.add((endpoint, method))
+    return sorted(
+        '{} {}'.format(method, rule.rule)
+        for rule in app.url_map.iter_rules()
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+        if rule.endpoint not in ('static', 'asset') and (rule.endpoint, method) not in covered
+    )
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append('{}: {} statements, baseline {}'.format(name, result['queries'], before['queries']))
+        delta = result['p50_ms'] - before['p50_ms']
+        if delta > before['p50_ms'] * tolerance and delta > min_delta_ms:
+            regressions.append('{}: p50 {:.1f} ms, baseline {:.1f} ms'.format(name, result['p50_ms'], before['p50_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', default='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    add_arguments(parser)
+    parser.add_argument('--requests', type=int, default=30, help='Timed requests per route.')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--page-cache', action='store_true', help='Keep the configured page cache.')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='Allowed p50 slowdown, as a fraction.')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    # the app reads its database from the environment at import time
+    os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app
+    from extensions import db
+    app = create_app()
+    from cache import NullCache
+    from queries import show_listing
+
+    app.config['SQL_STATS_HEADERS'] = True
+    app.config['POOL_STATS_ENDPOINT'] = True
+    # debug mode logs every request's debug lines to stderr
+    app.logger.setLevel(logging.WARNING)
+    if not args.page_cache:
+        app.extensions['page_cache'] = NullCache()
+
+    with app.app_context():
+        targets = reset_and_seed(db, args)
+        targets['shows_cursor'] = quote(show_listing()[1] or '')
+        # venues to delete, one per request, sparing the ones other cases use
+        targets['delete_venue_ids'] = [
+            id for id in range(targets['venue'], 0, -1)
+            if id not in (targets['busiest_venue_id'], targets['quietest_venue_id'])
+        ]
+        dialect = db.engine.dialect.name
+        db.session.remove()
+
+    print('{}: {venue} venues, {artist} artists, {show} shows'.format(dialect, **targets))
+    print('{:<22} {:>6} {:>9} {:>9} {:>8}'.format('route', 'status', 'p50 ms', 'p95 ms', 'queries'))
+
+    results = {}
+    for name, method, path, data in CASES:
+        # a fresh client per route, so flashed messages don't pile up
+        client = app.test_client()
+        latencies, queries, status = run_case(client, method, path, data, targets, args.requests, args.warmup)
+        results[name] = {
+            "route": '{} {}'.format(method, path),
+            "status": status,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "queries": queries,
+        }
+        print('{:<22} {status:>6} {p50_ms:>9.2f} {p95_ms:>9.2f} {queries:>8}'.format(name, **results[name]))
+
+    for route in uncovered_routes(app):
+        print('not benchmarked: ' + route)
+
+    dataset = dict((key, getattr(args, key)) for key in ('venues', 'artists', 'shows', 'skew', 'seed'))
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({"dialect": dialect, "dataset": dataset, "routes": results}, f, indent=2)
+            f.write('\n')
+        print('baseline written to {}'.format(args.baseline))
+        return
+
+    if not os.path.exists(args.baseline):
+        print('no baseline at {}; run with --save-baseline to record one'.format(args.baseline))
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['dialect'] != dialect or baseline['dataset'] != dataset:
+        print('warning: baseline was recorded on {} with {}'.format(baseline['dialect'], baseline['dataset']))
+
+    regressions = compare(results, baseline['routes'], args.tolerance, args.min_delta_ms)
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+    errors = ['{}: status {}'.format(name, result['status']) for name, result in results.items() if result['status'] >= 500]
+    for error in errors:
+        print('ERROR ' + error)
+    if regressions or errors:
+        sys.exit(1)
+    print('no regressions against {}'.format(args.baseline))
+
+
+if __name__ == '__main__':
+    main()
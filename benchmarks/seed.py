@@ -0,0 +1,163 @@
+#----------------------------------------------------------------------------#
+# Synthetic data for benchmarks.
+#
+#   python -m benchmarks.seed --database-url postgresql://localhost/fyyur_bench \
+#       --venues 5000 --artists 20000 --shows 1000000
+#
+# Popularity is skewed: venue and artist weights follow a Pareto distribution,
+# so a handful of venues host a large share of the shows while most host a
+# few, and likewise for artists. The target database is dropped and recreated.
+#----------------------------------------------------------------------------#
+
+import argparse, os, random, time
+from datetime import datetime, timedelta
+
+CHUNK_SIZE = 5000
+STATES = ['CA', 'NY', 'TX', 'IL', 'WA', 'LA', 'TN', 'MA', 'FL', 'CO', 'GA', 'OR']
+CITIES = ['Springfield', 'Riverside', 'Franklin', 'Greenville', 'Fairview', 'Madison',
+          'Georgetown', 'Salem', 'Clinton', 'Arlington', 'Ashland', 'Dover']
+ADJECTIVES = ['Musical', 'Electric', 'Velvet', 'Golden', 'Wild', 'Blue', 'Rusty', 'Silver',
+              'Midnight', 'Crimson', 'Lucky', 'Hollow', 'Neon', 'Royal', 'Broken', 'Lonesome']
+VENUE_NOUNS = ['Hop', 'Lounge', 'Hall', 'Room', 'Garden', 'Club', 'Theatre', 'Tavern', 'Cellar', 'Stage']
+ARTIST_NOUNS = ['Band', 'Petals', 'Sax', 'Collective', 'Trio', 'Orchestra', 'Kings', 'Echoes', 'Riders', 'Union']
+
+
+def _insert(connection, table, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        connection.execute(table.insert(), rows[start:start + CHUNK_SIZE])
+
+
+def _name(rng, nouns, i):
+    return 'The {} {} {}'.format(rng.choice(ADJECTIVES), rng.choice(nouns), i)
+
+
+def _weights(rng, count, alpha):
+    # pareto weights: most entities light, a few very heavy
+    return [rng.paretovariate(alpha) for _ in range(count)]
+
+
+def seed(connection, venues=1000, artists=1000, shows=20000, skew=1.2, seed=0):
+    # fills an empty schema with genres, venues, artists and shows spread over
+    # two years either side of now. returns row counts plus the busiest and
+    # quietest venue/artist ids, for picking benchmark targets.
+    from vocabulary import GENRES
+    from models import Genre, Venue, Artist, Show, CounterSweep, venue_genre, artist_genre
+    from counters import recount_statement
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    genres = list(GENRES)
+    genre_ids = range(1, len(genres) + 1)
+
+    _insert(connection, Genre.__table__, [{"id": i + 1, "name": name} for i, name in enumerate(genres)])
+    _insert(connection, Venue.__table__, [
+        {
+            "id": i,
+            "name": _name(rng, VENUE_NOUNS, i),
+            "city": rng.choice(CITIES),
+            "state": rng.choice(STATES),
+            "address": "{} Main St".format(i),
+            "phone": "555-{:03d}-{:04d}".format(rng.randint(0, 999), rng.randint(0, 9999)),
+            "seeking_talent": rng.random() < 0.3,
+            "updated_at": now
+        }
+        for i in range(1, venues + 1)
+    ])
+    _insert(connection, Artist.__table__, [
+        {
+            "id": i,
+            "name": _name(rng, ARTIST_NOUNS, i),
+            "city": rng.choice(CITIES),
+            "state": rng.choice(STATES),
+            "seeking_venue": rng.random() < 0.3,
+            "updated_at": now
+        }
+        for i in range(1, artists + 1)
+    ])
+    _insert(connection, venue_genre, [
+        {"venue_id": i, "genre_id": genre_id}
+        for i in range(1, venues + 1)
+        for genre_id in rng.sample(genre_ids, rng.randint(1, 3))
+    ])
+    _insert(connection, artist_genre, [
+        {"artist_id": i, "genre_id": genre_id}
+        for i in range(1, artists + 1)
+        for genre_id in rng.sample(genre_ids, rng.randint(1, 3))
+    ])
+
+    venue_weights = _weights(rng, venues, skew)
+    artist_weights = _weights(rng, artists, skew)
+    venue_ids = list(range(1, venues + 1))
+    artist_ids = list(range(1, artists + 1))
+    for start in range(1, shows + 1, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, shows + 1 - start)
+        show_venues = rng.choices(venue_ids, weights=venue_weights, k=count)
+        show_artists = rng.choices(artist_ids, weights=artist_weights, k=count)
+        _insert(connection, Show.__table__, [
+            {
+                "id": start + i,
+                "venue_id": show_venues[i],
+                "artist_id": show_artists[i],
+                "start_time": now + timedelta(minutes=rng.randint(-525600 * 2, 525600 * 2)),
+                "updated_at": now
+            }
+            for i in range(count)
+        ])
+
+    for model in (Venue, Artist):
+        connection.execute(recount_statement(model, now))
+    _insert(connection, CounterSweep.__table__, [{"id": 1, "swept_at": now}])
+
+    by_weight = lambda weights: sorted(range(len(weights)), key=weights.__getitem__)
+    venue_order, artist_order = by_weight(venue_weights), by_weight(artist_weights)
+    return {
+        "genre": len(genres),
+        "venue": venues,
+        "artist": artists,
+        "show": shows,
+        "busiest_venue_id": venue_order[-1] + 1,
+        "quietest_venue_id": venue_order[0] + 1,
+        "busiest_artist_id": artist_order[-1] + 1,
+        "quietest_artist_id": artist_order[0] + 1,
+    }
+
+
+def add_arguments(parser):
+    parser.add_argument('--venues', type=int, default=2000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=100000)
+    parser.add_argument('--skew', type=float, default=1.2, help='Pareto alpha; lower is more skewed')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def reset_and_seed(db, args):
+    # drops and recreates the schema on the app's database, then seeds it
+    db.drop_all(bind_key=None)
+    db.create_all(bind_key=None)
+    with db.engine.begin() as connection:
+        return seed(connection, venues=args.venues, artists=args.artists, shows=args.shows,
+                    skew=args.skew, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    # the app reads its database from the environment at import time
+    os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app
+    from extensions import db
+    app = create_app()
+
+    started = time.perf_counter()
+    with app.app_context():
+        info = reset_and_seed(db, args)
+    print('seeded in {:.1f}s'.format(time.perf_counter() - started))
+    for key, value in info.items():
+        print('  {}: {}'.format(key, value))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#----------------------------------------------------------------------------#
+# Cold start cost: what every gunicorn worker and `flask` CLI call pays.
+#
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --path /tmp/fyyur-old     # another checkout
+#   python -m benchmarks.startup --wsgi                    # as wsgi.py builds it
+#
+# Each run is a fresh interpreter that imports the app module, builds the
+# app and serves GET / through the test client, timing each step. The
+# slowest modules come from `python -X importtime`.
+#----------------------------------------------------------------------------#
+
+import argparse, json, os, re, statistics, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# works on trees with and without create_app()
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+if hasattr(module, 'create_app'):
+    app = module.create_app(cli=sys.argv[1] != 'wsgi')
+else:
+    app = module.app
+created = time.perf_counter()
+app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "create_app": created - imported,
+    "first_request": served - created,
+    "total": served - started,
+}))
+'''
+
+
+def _env():
+    env = dict(os.environ, DATABASE_URL='sqlite://', PYTHONDONTWRITEBYTECODE='1')
+    env.pop('PYTHONPATH', None)
+    return env
+
+
+def probe(path, mode='cli'):
+    output = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', PROBE, mode],
+        cwd=path, env=_env(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(path, count):
+    # (cumulative seconds, module) for the top-level imports of the app module
+    stderr = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-X', 'importtime', '-c', 'import app'],
+        cwd=path, env=_env(), capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)', line)
+        # depth 1: imported directly by app.py or the modules it pulls in first
+        if match and len(match.group(2)) <= 3:
+            rows.append((int(match.group(1)) / 1e6, match.group(3)))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--path', default=ROOT, help='Checkout to measure.')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list.')
+    parser.add_argument('--wsgi', action='store_true',
+                        help='Build the app without the CLI extras, as a web worker does.')
+    args = parser.parse_args()
+    mode = 'wsgi' if args.wsgi else 'cli'
+
+    # the first run warms the OS file cache and writes no bytecode
+    probe(args.path, mode)
+    runs = [probe(args.path, mode) for _ in range(args.runs)]
+
+    print('{} ({}, {} runs, median)'.format(args.path, mode, args.runs))
+    for step in ('import', 'create_app', 'first_request', 'total'):
+        print('  {:<14} {:>8.1f} ms'.format(step, statistics.median(run[step] for run in runs) * 1000))
+
+    print('slowest imports')
+    for seconds, module in slowest_imports(args.path, args.top):
+        print('  {:<30} {:>8.1f} ms'.format(module, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import threading, time
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+from flask import current_app, g, request, session, make_response, Response
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+
+class LocalCache(object):
+    # in-process LRU cache with a per-entry TTL. each gunicorn worker keeps
+    # its own copy, so invalidations only reach the worker that made them.
+
+    def __init__(self, maxsize=512, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires = self._entries.get(key, (0, None))
+            self._entries[key] = (value + 1, expires)
+            self._entries.move_to_end(key)
+            return value + 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SharedCache(object):
+    # cache shared by every worker, on top of a redis-py style client
+    # (get/set/incr/delete). pages are stored as utf-8 bytes.
+
+    def __init__(self, client, ttl=60, prefix='fyyur:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self.client.set(self.prefix + key, value, ex=ttl or None)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class LocalClient(object):
+    # stand-in for a redis client, for running SharedCache without a server
+
+    def __init__(self):
+        self._cache = LocalCache(maxsize=10000, ttl=0)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ex=None):
+        self._cache.set(key, value, ttl=ex)
+
+    def incr(self, key):
+        return self._cache.incr(key)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+
+class NullCache(object):
+    # disables page caching
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def delete(self, key):
+        pass
+
+
+def make_backend(config):
+    cache_type = config.get('PAGE_CACHE_TYPE', 'null')
+    ttl = config.get('PAGE_CACHE_TTL', 60)
+
+    if cache_type == 'local':
+        return LocalCache(maxsize=config.get('PAGE_CACHE_SIZE', 512), ttl=ttl)
+    if cache_type == 'shared':
+        url = config.get('PAGE_CACHE_URL')
+        if url:
+            # redis is only needed when a shared cache server is configured
+            import redis
+            client = redis.Redis.from_url(url)
+        else:
+            client = LocalClient()
+        return SharedCache(client, ttl=ttl)
+    if cache_type == 'null':
+        return NullCache()
+    raise ValueError('Unknown PAGE_CACHE_TYPE: {}'.format(cache_type))
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+class PageCache(object):
+    # caches rendered GET pages by path and query string.
+    #
+    # every path has a generation counter that is part of its page keys, so
+    # invalidating a path drops all of its variants (/shows?past=1&cursor=...)
+    # with a single write, on any backend.
+
+    # the backend is per app, in app.extensions['page_cache'], so apps built
+    # with different configs don't share one.
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['page_cache'] = make_backend(app.config)
+
+    @property
+    def backend(self):
+        return current_app.extensions['page_cache']
+
+    def _generation(self, path):
+        return self.backend.get('gen:' + path) or 0
+
+    def _key(self, path, args):
+        query = '&'.join('{}={}'.format(k, v) for k, v in sorted(args.items(multi=True)))
+        # under `conditional`, a page is stored per ETag: a change that doesn't
+        # invalidate the path still changes the ETag, and so the body served
+        key = 'page:{}#{}?{}'.format(path, self._generation(path), query)
+        if 'page_etag' in g:
+            key += '@' + g.page_etag
+        return key
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # pages rendered while flash messages are pending would hand those
+            # messages to every later visitor, so bypass the cache entirely
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            key = self._key(request.path, request.args)
+            page = self.backend.get(key)
+            if page is None:
+                page = view(*args, **kwargs)
+                if not isinstance(page, str):
+                    return page
+                self.backend.set(key, page)
+            return page
+        return wrapper
+
+    def invalidate(self, *paths):
+        for path in set(paths):
+            self.backend.incr('gen:' + path)
+
+    def clear(self):
+        if hasattr(self.backend, 'clear'):
+            self.backend.clear()
+
+#----------------------------------------------------------------------------#
+# Conditional requests.
+#----------------------------------------------------------------------------#
+
+def conditional(validators):
+    # answers If-None-Match / If-Modified-Since with a 304 before the view
+    # runs. `validators` takes the view arguments and returns (etag,
+    # last_modified), or None to always run the view (e.g. unknown ids).
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            found = validators(*args, **kwargs)
+            if found is None:
+                return view(*args, **kwargs)
+
+            etag, last_modified = found
+            # timestamps are stored naive; read them as UTC, like werkzeug does
+            last_modified = last_modified.replace(microsecond=0, tzinfo=last_modified.tzinfo or timezone.utc)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = request.if_modified_since is not None \
+                    and last_modified <= request.if_modified_since
+
+            if not_modified:
+                response = Response(status=304)
+            else:
+                g.page_etag = etag
+                response = make_response(view(*args, **kwargs))
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # clients and the CDN may store the page but must revalidate it
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
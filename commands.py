@@ -0,0 +1,420 @@
+import csv, json, os, time
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+import click
+from flask import current_app, url_for
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+from werkzeug.datastructures import MultiDict
+from extensions import db, page_cache
+from forms import VenueForm, ArtistForm, ShowForm
+from models import Venue, Artist, Show, venue_genre, artist_genre
+from genres import genre_ids_by_name, genre_link_column
+from queries import stream_table
+from deletion import delete_venues
+from replicas import primary_request_context
+from api import json_default
+import assets
+import counters
+
+#----------------------------------------------------------------------------#
+# CLI: flask fyyur ...
+#----------------------------------------------------------------------------#
+
+fyyur_cli = AppGroup('fyyur', help='Fyyur data management commands.')
+
+# kind -> (form validating a row, model, genre association table)
+IMPORTS = {
+    'venues': (VenueForm, Venue, venue_genre),
+    'artists': (ArtistForm, Artist, artist_genre),
+    'shows': (ShowForm, Show, None),
+}
+
+
+# stands in for a row that couldn't be parsed, so it's rejected in its place
+Unreadable = namedtuple('Unreadable', 'text error')
+
+
+def read_rows(source, format):
+    # yields (line number, row) from a CSV or NDJSON file without loading it.
+    # a row is normally a dict; an NDJSON line that isn't JSON is Unreadable.
+    # in CSV files, genres are a comma separated list.
+    if format == 'csv':
+        reader = csv.DictReader(source)
+        for row in reader:
+            # cells beyond the header row
+            row.pop(None, None)
+            if row.get('genres'):
+                row['genres'] = [name.strip() for name in row['genres'].split(',') if name.strip()]
+            yield reader.line_num, row
+    else:
+        for line_no, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as error:
+                yield line_no, Unreadable(line.rstrip('\n'), 'invalid JSON: {}'.format(error))
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _formdata(row):
+    formdata = MultiDict()
+    for key, value in row.items():
+        if isinstance(value, list):
+            for item in value:
+                formdata.add(key, str(item))
+        elif value is not None:
+            formdata.add(key, value if isinstance(value, str) else str(value))
+    return formdata
+
+
+def _values(model, form):
+    # column values for `model` from a validated form
+    values = dict(
+        (column.name, form[column.name].data)
+        for column in model.__table__.c
+        if column.name in form
+    )
+    for flag in ('seeking_talent', 'seeking_venue'):
+        if flag in values:
+            values[flag] = bool(values[flag])
+    for key in ('artist_id', 'venue_id'):
+        if key in values:
+            values[key] = int(values[key])
+    return values
+
+
+def _missing_ids(model, ids):
+    found = set(db.session.execute(select(model.id).where(model.id.in_(ids))).scalars())
+    return set(ids) - found
+
+
+def import_chunk(kind, rows, reject):
+    # validates, maps genre names to ids and writes one chunk in a single transaction.
+    # for shows, returns the ids of the venues/artists whose pages they change.
+    form_class, model, genre_table = IMPORTS[kind]
+
+    valid = []
+    for line_no, row in rows:
+        if isinstance(row, Unreadable):
+            reject(line_no, row.text, row.error)
+            continue
+        if not isinstance(row, dict):
+            reject(line_no, row, 'not a JSON object')
+            continue
+        try:
+            data = row
+            names = row.get('genres')
+            if genre_table is not None and names:
+                # the forms take genre ids; rejected rows keep their names
+                ids, unknown = genre_ids_by_name([names] if isinstance(names, str) else names)
+                if unknown:
+                    reject(line_no, row, {'genres': ['unknown genres: ' + ', '.join(map(str, unknown))]})
+                    continue
+                data = dict(row, genres=ids)
+            form = form_class(formdata=_formdata(data), meta={'csrf': False})
+            values = _values(model, form) if form.validate() else None
+        except (TypeError, ValueError):
+            form, values = None, None
+        if values is None:
+            reject(line_no, row, form.errors if form is not None else 'invalid row')
+        else:
+            valid.append((line_no, row, values, form.genres.data if genre_table is not None else None))
+
+    if kind == 'shows' and valid:
+        missing_venues = _missing_ids(Venue, set(values['venue_id'] for _, _, values, _ in valid))
+        missing_artists = _missing_ids(Artist, set(values['artist_id'] for _, _, values, _ in valid))
+        kept = []
+        for line_no, row, values, genres in valid:
+            if values['venue_id'] in missing_venues or values['artist_id'] in missing_artists:
+                reject(line_no, row, {'venue_id/artist_id': ['unknown venue or artist']})
+            else:
+                kept.append((line_no, row, values, genres))
+        valid = kept
+
+    if not valid:
+        return {}
+
+    try:
+        # insertmanyvalues batches these into multi-row INSERT ... RETURNING
+        ids = db.session.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            [values for _, _, values, _ in valid]
+        ).scalars().all()
+
+        if genre_table is not None:
+            entity_column = genre_link_column(genre_table).name
+            links = [
+                {entity_column: entity_id, "genre_id": genre_id}
+                for entity_id, (_, _, _, genres) in zip(ids, valid)
+                for genre_id in dict.fromkeys(genres)
+            ]
+            if links:
+                db.session.execute(genre_table.insert(), links)
+
+        if kind == 'shows':
+            since = counters.last_sweep() or datetime.now()
+            counters.recount(Venue, set(values['venue_id'] for _, _, values, _ in valid), since=since)
+            counters.recount(Artist, set(values['artist_id'] for _, _, values, _ in valid), since=since)
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Import chunk failed')
+        for line_no, row, _, _ in valid:
+            reject(line_no, row, str(e))
+        return {}
+
+    if kind == 'shows':
+        return {
+            'venues': set(values['venue_id'] for _, _, values, _ in valid),
+            'artists': set(values['artist_id'] for _, _, values, _ in valid),
+        }
+    # new venues and artists have no pages cached yet
+    return {}
+
+
+@fyyur_cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTS)))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'format', type=click.Choice(['csv', 'ndjson']),
+              help='Input format. Defaults to the file extension.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows per transaction.')
+@click.option('--errors', 'errors_path', default='rejected.ndjson', show_default=True,
+              help='NDJSON file for rejected rows, created on the first rejection.')
+def import_command(kind, source, format, chunk_size, errors_path):
+    """Bulk import venues, artists or shows from CSV or NDJSON.
+
+    Rows are validated with the same forms as the web handlers. Shows must
+    reference existing venue_id/artist_id values.
+    """
+    format = format or ('csv' if source.name.endswith('.csv') else 'ndjson')
+    counts = {'read': 0, 'imported': 0, 'rejected': 0}
+    errors_file = []
+
+    def reject(line_no, row, errors):
+        if not errors_file:
+            errors_file.append(open(errors_path, 'w', encoding='utf-8'))
+        errors_file[0].write(json.dumps({"line": line_no, "row": row, "errors": errors}, default=str) + '\n')
+        counts['rejected'] += 1
+
+    started = time.perf_counter()
+    touched = {'venues': set(), 'artists': set()}
+    with primary_request_context(current_app):
+        for chunk in chunked(read_rows(source, format), chunk_size):
+            counts['read'] += len(chunk)
+            rejected = counts['rejected']
+            for key, ids in import_chunk(kind, chunk, reject).items():
+                touched[key].update(ids)
+            counts['imported'] += len(chunk) - (counts['rejected'] - rejected)
+            elapsed = time.perf_counter() - started
+            click.echo('{read} read, {imported} imported, {rejected} rejected'.format(**counts)
+                       + ' ({:.0f} rows/s)'.format(counts['read'] / elapsed if elapsed else 0), err=True)
+
+        if counts['imported']:
+            paths = [url_for('venues.venues'), url_for('artists.artists'), url_for('shows.shows')]
+            if kind == 'shows':
+                paths += [url_for('venues.show_venue', venue_id=id) for id in touched['venues']]
+                paths += [url_for('artists.show_artist', artist_id=id) for id in touched['artists']]
+            page_cache.invalidate(*paths)
+
+    if errors_file:
+        errors_file[0].close()
+        click.echo('Rejected rows written to {}'.format(errors_path), err=True)
+
+
+@fyyur_cli.command('delete-venues')
+@click.argument('venue_ids', nargs=-1, type=int)
+@click.option('--from-file', type=click.File('r'), help='Also delete the ids in this file, one per line.')
+@click.option('--yes', is_flag=True, help='Don\'t ask for confirmation.')
+def delete_venues_command(venue_ids, from_file, yes):
+    """Delete venues with their shows and genre links, in one transaction."""
+    venue_ids = set(venue_ids)
+    if from_file is not None:
+        venue_ids.update(int(line) for line in from_file if line.strip())
+    if not venue_ids:
+        raise click.UsageError('no venue ids given')
+    if not yes:
+        click.confirm('Delete {} venues and all their shows?'.format(len(venue_ids)), abort=True)
+
+    try:
+        deleted, artist_ids = delete_venues(venue_ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if deleted:
+        with primary_request_context(current_app):
+            page_cache.invalidate(
+                url_for('venues.venues'),
+                url_for('shows.shows'),
+                *[url_for('venues.show_venue', venue_id=id) for id in deleted]
+                + [url_for('artists.show_artist', artist_id=id) for id in artist_ids]
+            )
+    missing = sorted(venue_ids - set(deleted))
+    click.echo('{} venues deleted'.format(len(deleted)), err=True)
+    if missing:
+        click.echo('not found: ' + ', '.join(str(id) for id in missing), err=True)
+
+
+@fyyur_cli.command('sweep-counters')
+def sweep_counters_command():
+    """Recount upcoming shows for venues and artists whose shows have started.
+
+    Run it every few minutes (cron, Heroku Scheduler); the counters on the
+    listing and search pages are stale by at most that interval.
+    """
+    started = time.perf_counter()
+    counts = counters.sweep()
+    if counts['venue']:
+        with primary_request_context(current_app):
+            page_cache.invalidate(url_for('venues.venues'))
+    click.echo('recounted {venue} venues, {artist} artists'.format(**counts)
+               + ' ({:.2f}s)'.format(time.perf_counter() - started), err=True)
+
+
+@fyyur_cli.command('check-counters')
+@click.option('--repair', is_flag=True, help='Recount the rows that have drifted.')
+def check_counters_command(repair):
+    """Compare the upcoming show counters with the show table.
+
+    Exits with status 1 when drift is found and not repaired.
+    """
+    found = 0
+    for model in counters.MODELS:
+        rows = counters.drift(model)
+        found += len(rows)
+        for entity_id, stored, actual in rows:
+            click.echo('{} {}: stored {}, actual {}'.format(model.__tablename__, entity_id, stored, actual))
+        if rows and repair:
+            counters.recount(model, [row[0] for row in rows])
+    if found and repair:
+        db.session.commit()
+        with primary_request_context(current_app):
+            page_cache.invalidate(url_for('venues.venues'))
+        click.echo('{} counters repaired'.format(found), err=True)
+    elif found:
+        raise click.exceptions.Exit(1)
+    else:
+        click.echo('counters are consistent', err=True)
+
+
+@fyyur_cli.command('build-assets')
+@click.option('--clean', is_flag=True, help='Remove the files of earlier builds.')
+def build_assets_command(clean):
+    """Bundle, minify, fingerprint and precompress the CSS and JS.
+
+    Writes static/dist; restart the app to pick up the new manifest.
+    """
+    manifest = assets.build(current_app.static_folder, clean=clean)
+    for name, filename in sorted(manifest.items()):
+        path = os.path.join(current_app.static_folder, assets.DIST, filename)
+        sizes = [os.path.getsize(path)] + [
+            os.path.getsize(path + suffix) for suffix in ('.gz', '.br') if os.path.exists(path + suffix)
+        ]
+        click.echo('{} -> {} ({})'.format(name, filename, ', '.join('{:,} B'.format(size) for size in sizes)))
+
+
+EXPORT_TABLES = ['genre', 'venue', 'artist', 'show', 'venue_genre', 'artist_genre']
+
+
+class NdjsonWriter(object):
+
+    def __init__(self, path, table):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self.file.writelines(json.dumps(row, default=json_default) + '\n' for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(object):
+
+    def __init__(self, path, table):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=[column.name for column in table.c])
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter(object):
+    # one row group per chunk, with the schema taken from the table so that
+    # chunks where a column happens to be all NULL still line up. pyarrow is
+    # only needed for this format.
+
+    def __init__(self, path, table):
+        try:
+            import pyarrow, pyarrow.parquet
+        except ImportError:
+            raise click.UsageError('--format parquet requires pyarrow (pip install pyarrow)')
+        self.pyarrow = pyarrow
+        types = {
+            'INTEGER': pyarrow.int64(),
+            'BOOLEAN': pyarrow.bool_(),
+            'DATETIME': pyarrow.timestamp('us'),
+        }
+        self.schema = pyarrow.schema([
+            (column.name, types.get(column.type.__visit_name__.upper(), pyarrow.string()))
+            for column in table.c
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        self.writer.write_table(self.pyarrow.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+EXPORT_WRITERS = {
+    'ndjson': NdjsonWriter,
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+}
+
+
+@fyyur_cli.command('export')
+@click.argument('tables', nargs=-1, type=click.Choice(EXPORT_TABLES))
+@click.option('--format', 'format', type=click.Choice(sorted(EXPORT_WRITERS)), default='ndjson', show_default=True)
+@click.option('--output-dir', default='.', show_default=True, type=click.Path(file_okay=False))
+@click.option('--since', type=click.DateTime(), default=None,
+              help='Only rows modified at or after this time (incremental export).')
+@click.option('--chunk-size', default=10000, show_default=True, help='Rows fetched and written at a time.')
+def export_command(tables, format, output_dir, since, chunk_size):
+    """Export tables to NDJSON, CSV or Parquet, one <table>.<format> file each.
+
+    Rows are read through a server-side cursor and written chunk by chunk, so
+    memory use doesn't grow with table size. Defaults to every table.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for name in tables or EXPORT_TABLES:
+        table = db.metadata.tables[name]
+        path = os.path.join(output_dir, '{}.{}'.format(name, format))
+        writer = EXPORT_WRITERS[format](path, table)
+        count = 0
+        started = time.perf_counter()
+        try:
+            for chunk in chunked((dict(row) for row in stream_table(table, since=since, chunk_size=chunk_size)), chunk_size):
+                writer.write(chunk)
+                count += len(chunk)
+        finally:
+            writer.close()
+        click.echo('{}: {} rows to {} ({:.1f}s)'.format(name, count, path, time.perf_counter() - started), err=True)
@@ -1,5 +1,8 @@
 import os
-SECRET_KEY = os.urandom(32)
+from dbpool import engine_options, replica_binds, async_database_url, async_engine_options
+# every worker must share the key for sessions (flashes, replica stickiness)
+# to survive from one request to the next; set it in production
+SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -10,4 +13,73 @@ DEBUG = True
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgres://postgres@localhost:5432/fyyur'
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgres://postgres@localhost:5432/fyyur')
+
+# Connection pool, sized per gunicorn worker. DB_STATEMENT_TIMEOUT is in
+# milliseconds, 0 disables it.
+_pool = dict(
+    pool_size=int(os.environ.get('DB_POOL_SIZE', 5)),
+    max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+    pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    pool_pre_ping=os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+    statement_timeout=int(os.environ.get('DB_STATEMENT_TIMEOUT', 0))
+)
+SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, **_pool)
+
+# Read replicas, a comma-separated DATABASE_REPLICA_URLS. GET and HEAD
+# requests read from them in turn, skipping any that failed their last health
+# check (run every REPLICA_CHECK_INTERVAL seconds); everything else uses the
+# primary. After a request that commits a write, the same browser reads from
+# the primary for REPLICA_STICKY_SECONDS, so it sees its own changes despite
+# replication lag.
+# Locally, a copy of a SQLite file works as a replica, e.g.
+# DATABASE_REPLICA_URLS='sqlite:///file:/tmp/replica.db?mode=ro&uri=true'
+REPLICA_DATABASE_URIS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+SQLALCHEMY_BINDS = replica_binds(REPLICA_DATABASE_URIS, **_pool)
+REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', 10))
+REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+# Async reads: with ASYNC_READS=1 the venue, artist and show listings and the
+# venue/artist pages run their queries on an asyncio engine (asyncpg, or
+# aiosqlite for SQLite files), independent queries at the same time. Its pool
+# is sized like the one above; ASYNC_DATABASE_URL defaults to the same database.
+ASYNC_READS = os.environ.get('ASYNC_READS', '0') == '1'
+ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL') or async_database_url(SQLALCHEMY_DATABASE_URI)
+ASYNC_ENGINE_OPTIONS = async_engine_options(ASYNC_DATABASE_URI, **_pool)
+
+# Pool stats at /internal/db-pool
+POOL_STATS_ENDPOINT = os.environ.get('POOL_STATS_ENDPOINT', '0') == '1'
+
+# Rendered page cache: 'null' (disabled, the default), 'local' (per process)
+# or 'shared' (redis at PAGE_CACHE_URL, or an in-process stand-in when no URL
+# is set). Edits invalidate pages only in the cache they can reach, so 'local'
+# is for a single process: with several gunicorn workers, or to have `flask
+# fyyur` commands invalidate what the server cached, use 'shared' with a
+# PAGE_CACHE_URL.
+PAGE_CACHE_TYPE = os.environ.get('PAGE_CACHE_TYPE', 'null')
+PAGE_CACHE_URL = os.environ.get('PAGE_CACHE_URL')
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 60))
+PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 512))
+
+# CSS/JS bundles: built into static/dist by `flask fyyur build-assets` and
+# served as immutable. ASSETS_DEBUG links the unbundled source files instead.
+ASSETS_DEBUG = os.environ.get('ASSETS_DEBUG', '0') == '1'
+
+# Per-request SQL statistics. Statements slower than SLOW_QUERY_MS are logged
+# to SLOW_QUERY_LOG with their route. SQL_STATS_HEADERS adds X-DB-Queries and
+# X-DB-Time to responses; SQL_QUERY_BUDGET_STRICT turns views going over their
+# query budget into errors instead of warnings (use it in test runs).
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', 'slow_query.log')
+SQL_STATS_HEADERS = os.environ.get('SQL_STATS_HEADERS', '0') == '1'
+SQL_QUERY_BUDGET_STRICT = os.environ.get('SQL_QUERY_BUDGET_STRICT', '0') == '1'
+
+# Logging (when not in debug mode): JSON lines through a background queue into
+# LOG_FILE, rotated at LOG_MAX_BYTES. Only LOG_DEBUG_SAMPLE_RATE of the DEBUG
+# records are kept.
+LOG_FILE = os.environ.get('LOG_FILE', 'error.log')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0.01))
@@ -0,0 +1,111 @@
+from datetime import datetime
+from sqlalchemy import DateTime, func, literal, select, update
+from extensions import db
+from models import Venue, Artist, Show, CounterSweep
+
+#----------------------------------------------------------------------------#
+# Upcoming show counters.
+#----------------------------------------------------------------------------#
+
+# venue.upcoming_shows_count and artist.upcoming_shows_count hold the number
+# of shows starting after the last sweep, so listings and search read them
+# instead of counting shows. writes keep them in step in their own transaction:
+#
+#   - creating a show adds one to its venue and artist if it is upcoming
+#   - bulk imports and deletes recount the venues/artists they touched
+#   - `flask fyyur sweep-counters`, run every few minutes, recounts the
+#     venues/artists whose shows started since the previous sweep
+#
+# so between sweeps a count can include shows that have just started.
+# `flask fyyur check-counters` reports (and with --repair fixes) any drift.
+
+MODELS = (Venue, Artist)
+
+
+def _show_fk(model):
+    return Show.venue_id if model is Venue else Show.artist_id
+
+
+def last_sweep():
+    # when the counters were last swept, or None before the first sweep
+    return db.session.execute(select(CounterSweep.swept_at).where(CounterSweep.id == 1)).scalar()
+
+
+def upcoming_count(model, since):
+    # correlated count of a venue's or artist's shows starting after `since`
+    return select(func.count(Show.id)) \
+        .where(_show_fk(model) == model.id, Show.start_time > since) \
+        .scalar_subquery()
+
+
+def recount_statement(model, since, ids=None):
+    # sets the counters of `ids` (or every row) from the show table. the
+    # counters aren't page content, so updated_at is left alone.
+    statement = update(model.__table__).values(
+        upcoming_shows_count=upcoming_count(model, since),
+        updated_at=model.updated_at
+    )
+    if ids is not None:
+        statement = statement.where(model.id.in_(ids))
+    return statement
+
+
+def recount(model, ids=None, since=None):
+    # recounts on the session, as part of the caller's transaction. returns
+    # the number of rows updated.
+    since = since or last_sweep() or datetime.now()
+    return db.session.execute(recount_statement(model, since, ids)).rowcount
+
+
+def adjust_upcoming_counts(venue_id, artist_id, start_time, delta, since=None):
+    # +1 when a show is added, -1 when one is removed. like the other
+    # counter paths, counts relative to the last sweep: a show starting
+    # after it counts until the next sweep, even if it has started. the
+    # sweep time is read inside the UPDATEs, which costs no extra statement.
+    now = datetime.now()
+    if since is None:
+        since = func.coalesce(select(CounterSweep.swept_at).where(CounterSweep.id == 1).scalar_subquery(), now)
+    elif (start_time or now) <= since:
+        return
+    for model, entity_id in ((Venue, venue_id), (Artist, artist_id)):
+        db.session.execute(
+            update(model.__table__)
+                .where(model.id == entity_id, literal(start_time or now, DateTime) > since)
+                .values(upcoming_shows_count=model.upcoming_shows_count + delta, updated_at=model.updated_at)
+        )
+
+
+def sweep(now=None):
+    # recounts the venues and artists with shows that started since the last
+    # sweep (everything on the first one) and commits. returns the number of
+    # rows recounted per table.
+    now = now or datetime.now()
+    state = db.session.get(CounterSweep, 1)
+
+    counts = {}
+    for model in MODELS:
+        ids = None
+        if state is not None:
+            ids = select(_show_fk(model)) \
+                .where(Show.start_time > state.swept_at, Show.start_time <= now) \
+                .distinct()
+        counts[model.__tablename__] = db.session.execute(recount_statement(model, now, ids)).rowcount
+
+    if state is None:
+        db.session.add(CounterSweep(id=1, swept_at=now))
+    else:
+        state.swept_at = now
+    db.session.commit()
+    return counts
+
+
+def drift(model, since=None):
+    # (id, stored, actual) for every row whose counter is off. compared at the
+    # last sweep, which is what the counters are kept relative to.
+    since = since or last_sweep() or datetime.now()
+    actual = upcoming_count(model, since)
+    return db.session.execute(
+        select(model.id, model.upcoming_shows_count, actual)
+            .where(model.upcoming_shows_count != actual)
+            .order_by(model.id)
+    ).all()
@@ -0,0 +1,152 @@
+import threading, time
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+#----------------------------------------------------------------------------#
+# Connection pool instrumentation.
+#----------------------------------------------------------------------------#
+
+class PoolStats(object):
+    # checkout counters for one pool, shared by every thread of a worker
+
+    def __init__(self, name):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.peak_in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, waited, in_use):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+    def record_timeout(self, waited):
+        with self._lock:
+            self.timeouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self, pool=None):
+        with self._lock:
+            data = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "peak_in_use": self.peak_in_use,
+                "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+        return data
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def pool_stats(name='default'):
+    with _stats_lock:
+        if name not in _stats:
+            _stats[name] = PoolStats(name)
+        return _stats[name]
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool that records how long each checkout waited and how many
+    # connections were in use. stats are filed under the pool's logging name
+    # (create_engine's pool_logging_name), which survives engine.dispose().
+
+    def connect(self):
+        stats = pool_stats(getattr(self, 'logging_name', None) or 'default')
+        started = time.perf_counter()
+        try:
+            connection = super(InstrumentedQueuePool, self).connect()
+        except TimeoutError:
+            stats.record_timeout(time.perf_counter() - started)
+            raise
+        stats.record_checkout(time.perf_counter() - started, self.checkedout())
+        return connection
+
+
+def engine_options(url, pool_size=5, max_overflow=10, pool_timeout=30,
+                   pool_recycle=-1, pool_pre_ping=False, statement_timeout=0, name='primary'):
+    # create_engine options for SQLALCHEMY_ENGINE_OPTIONS. SQLite keeps
+    # SQLAlchemy's default pool since it doesn't use a client/server pool.
+    if not url.startswith('postgres'):
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_logging_name": name,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+    # updated_at is stored without a zone, in UTC; so is now() (the column's
+    # server default) whatever the server's default, as the validators expect
+    settings = "-c timezone=UTC"
+    if statement_timeout:
+        settings += " -c statement_timeout={:d}".format(statement_timeout)
+    options["connect_args"] = {"options": settings}
+    return options
+
+
+def replica_binds(urls, **pool):
+    # SQLALCHEMY_BINDS entries for the read replicas, replica0, replica1, ...
+    # each with a pool of its own, sized like the primary's. the primary's
+    # options are the defaults for every bind, so the pool name is set here.
+    binds = {}
+    for i, url in enumerate(urls):
+        name = 'replica{}'.format(i)
+        binds[name] = dict(engine_options(url, name=name, **pool), url=url)
+    return binds
+
+
+# async driver for each sync URL scheme, for the async read engine
+ASYNC_DRIVERS = {
+    'postgres': 'postgresql+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(url):
+    # the same database through its asyncio driver
+    scheme, sep, rest = url.partition('://')
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def async_engine_options(url, pool_size=5, max_overflow=10, pool_timeout=30,
+                         pool_recycle=-1, pool_pre_ping=False, statement_timeout=0):
+    # create_async_engine options, sized like the sync pool. asyncpg takes
+    # the statement timeout as a server setting rather than libpq options.
+    if not url.startswith('postgres'):
+        return {}
+
+    options = {
+        "pool_logging_name": "async",
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+    settings = {"timezone": "UTC"}
+    if statement_timeout:
+        settings["statement_timeout"] = str(statement_timeout)
+    options["connect_args"] = {"server_settings": settings}
+    return options
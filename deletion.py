@@ -0,0 +1,37 @@
+from sqlalchemy import delete, select
+from extensions import db
+from models import Venue, Artist, Show, venue_genre
+import counters
+
+#----------------------------------------------------------------------------#
+# Venue deletion.
+#----------------------------------------------------------------------------#
+
+# a venue's shows and genre links go with it. everything is done with one
+# set-based DELETE per table, whatever the number of venues or shows, and in
+# the caller's session so that it commits (or rolls back) as a whole.
+
+
+def delete_venues(venue_ids):
+    # deletes the venues in `venue_ids` with their shows and genre links, and
+    # recounts the upcoming shows of the artists that played them. returns
+    # (ids of the venues deleted, ids of those artists) for cache invalidation.
+    # the caller commits.
+    venue_ids = list(set(venue_ids))
+    if not venue_ids:
+        return [], []
+
+    found = list(db.session.execute(select(Venue.id).where(Venue.id.in_(venue_ids))).scalars())
+    if not found:
+        return [], []
+    artist_ids = list(db.session.execute(
+        select(Show.artist_id).where(Show.venue_id.in_(found)).distinct()
+    ).scalars())
+
+    db.session.execute(delete(Show.__table__).where(Show.venue_id.in_(found)))
+    db.session.execute(delete(venue_genre).where(venue_genre.c.venue_id.in_(found)))
+    db.session.execute(delete(Venue.__table__).where(Venue.id.in_(found)))
+    if artist_ids:
+        counters.recount(Artist, artist_ids)
+
+    return found, artist_ids
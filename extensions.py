@@ -0,0 +1,21 @@
+from flask_sqlalchemy import SQLAlchemy
+from cache import PageCache
+from querystats import QueryStats
+from assets import Assets
+from asyncdb import AsyncDB
+from replicas import RoutingSession, ReplicaRouter
+
+#----------------------------------------------------------------------------#
+# Extensions.
+#----------------------------------------------------------------------------#
+
+# created unbound and attached to the app in create_app(), so models, queries
+# and views can import them without importing the app module.
+
+# db.session reads from a replica on GET requests when replicas are configured
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+replicas = ReplicaRouter(db)
+page_cache = PageCache()
+query_stats = QueryStats()
+assets = Assets()
+async_db = AsyncDB()
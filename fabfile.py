@@ -13,6 +13,15 @@ def test():
         abort("Aborted at user request.")
 
 
+def bench():
+    # route latency and query counts against benchmarks/baseline.json
+    with settings(warn_only=True):
+        result = local("python -m benchmarks.routes", capture=True)
+    print(result)
+    if result.failed and not confirm("Benchmark regressions. Continue?"):
+        abort("Aborted at user request.")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
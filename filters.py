@@ -0,0 +1,40 @@
+from datetime import datetime
+from functools import lru_cache
+
+#----------------------------------------------------------------------------#
+# Template filters.
+#----------------------------------------------------------------------------#
+
+# babel and dateutil are imported on first use rather than at startup, and
+# babel only loads the data of a locale the first time it formats with it.
+
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma"
+}
+
+@lru_cache(maxsize=None)
+def default_locale():
+  import babel.dates
+  return babel.dates.LC_TIME
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+  # parsed babel pattern and locale, built once per (format, locale)
+  import babel, babel.dates
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
+@lru_cache(maxsize=4096)
+def cached_format_datetime(date, format, locale):
+  # pages list the same show times over and over, so memoize the output too
+  pattern, locale = datetime_pattern(format, locale)
+  return pattern.apply(date, locale)
+
+def format_datetime(value, format='medium', locale=None):
+  # handlers pass datetime objects straight through; strings are still parsed
+  if isinstance(value, datetime):
+    date = value
+  else:
+    import dateutil.parser
+    date = dateutil.parser.parse(value)
+  return cached_format_datetime(date, format, locale or default_locale())
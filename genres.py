@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from importlib import import_module
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from models import Genre
+from vocabulary import GENRES
+
+#----------------------------------------------------------------------------#
+# Genre resolution.
+#----------------------------------------------------------------------------#
+
+# genre names come from the fixed vocabulary in vocabulary.py, so a
+# small bounded cache holds the whole vocabulary. genre ids never change once
+# a row exists, so entries don't need to expire.
+GENRE_CACHE_SIZE = 256
+_genre_ids = OrderedDict()
+
+
+def _cache_get(name):
+    genre_id = _genre_ids.get(name)
+    if genre_id is not None:
+        _genre_ids.move_to_end(name)
+    return genre_id
+
+
+def _cache_put(name, genre_id):
+    _genre_ids[name] = genre_id
+    _genre_ids.move_to_end(name)
+    while len(_genre_ids) > GENRE_CACHE_SIZE:
+        _genre_ids.popitem(last=False)
+
+
+def clear_genre_cache():
+    global _genre_choices
+    _genre_ids.clear()
+    _genre_choices = None
+
+
+def _insert_genres(connection, names):
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING for every missing name at once.
+    # names inserted concurrently by another request are not returned here and
+    # get picked up by the caller's follow-up SELECT.
+    rows = [{"name": name} for name in names]
+    if connection.dialect.name in ('postgresql', 'sqlite'):
+        # the dialect the engine is using is loaded already; importing only that
+        # one keeps the other out of startup
+        insert = import_module('sqlalchemy.dialects.' + connection.dialect.name).insert
+        statement = insert(Genre.__table__).values(rows) \
+            .on_conflict_do_nothing(index_elements=['name']) \
+            .returning(Genre.__table__.c.id, Genre.__table__.c.name)
+        return dict((row.name, row.id) for row in connection.execute(statement))
+
+    connection.execute(Genre.__table__.insert(), rows)
+    return {}
+
+
+def _select_genres(connection, names):
+    statement = db.select(Genre.__table__.c.id, Genre.__table__.c.name) \
+        .where(Genre.__table__.c.name.in_(names))
+    return dict((row.name, row.id) for row in connection.execute(statement))
+
+
+def resolve_genre_ids(names):
+    # returns the genre ids for `names` (in order, duplicates dropped), creating
+    # any genre that doesn't exist yet. a cache hit costs no statements, a miss
+    # costs one SELECT plus at most one INSERT.
+    #
+    # new genres are committed on their own connection rather than in the
+    # caller's session, so a rolled back save can't leave ids in the cache
+    # that don't exist. call this before the session starts writing.
+    names = list(OrderedDict.fromkeys(names))
+    ids = dict((name, _cache_get(name)) for name in names)
+    missing = [name for name in names if ids[name] is None]
+
+    if missing:
+        with db.engine.begin() as connection:
+            found = _select_genres(connection, missing)
+            new = [name for name in missing if name not in found]
+            if new:
+                found.update(_insert_genres(connection, new))
+                lost = [name for name in new if name not in found]
+                if lost:
+                    found.update(_select_genres(connection, lost))
+        for name, genre_id in found.items():
+            _cache_put(name, genre_id)
+        ids.update(found)
+
+    return [ids[name] for name in names]
+
+
+def genre_link_column(table):
+    # venue_genre -> venue_id, artist_genre -> artist_id
+    return [column for column in table.c if column.name != 'genre_id'][0]
+
+
+def add_genres(table, entity_id, genre_ids):
+    # links an entity to its genres with a single executemany on the session.
+    # `table` is venue_genre or artist_genre.
+    if not genre_ids:
+        return
+    entity_column = genre_link_column(table)
+    db.session.execute(table.insert(), [
+        {entity_column.name: entity_id, "genre_id": genre_id}
+        for genre_id in genre_ids
+    ])
+
+
+def set_genres(table, entity_id, genre_ids):
+    # brings an entity's genre links in line with `genre_ids`, inserting and
+    # deleting only the rows that differ. returns True if anything changed.
+    entity_column = genre_link_column(table)
+    current = set(db.session.execute(
+        db.select(table.c.genre_id).where(entity_column == entity_id)
+    ).scalars())
+    wanted = set(genre_ids)
+
+    removed = current - wanted
+    if removed:
+        db.session.execute(
+            table.delete()
+                .where(entity_column == entity_id)
+                .where(table.c.genre_id.in_(removed))
+        )
+    add_genres(table, entity_id, [genre_id for genre_id in genre_ids if genre_id not in current])
+
+    return bool(removed or wanted - current)
+
+
+#----------------------------------------------------------------------------#
+# Genre choices.
+#----------------------------------------------------------------------------#
+
+# the forms offer genres as ((id, name), ...), in vocabulary order, so a save
+# gets ids straight from the form. the ids are loaded once per process, by
+# preload_genres() when a web worker starts or on the first form otherwise,
+# creating any vocabulary genre the table doesn't have yet.
+_genre_choices = None
+
+
+def genre_choices():
+    global _genre_choices
+    if _genre_choices is None:
+        _genre_choices = tuple(zip(resolve_genre_ids(GENRES), GENRES))
+    return _genre_choices
+
+
+def preload_genres():
+    # loads the genre choices in the app context, or leaves them for the first
+    # form if the database isn't reachable or migrated yet
+    try:
+        genre_choices()
+    except SQLAlchemyError as e:
+        current_app.logger.warning('genre ids not preloaded: %s', e.__class__.__name__)
+
+
+def choice_ids(values):
+    # the genre ids among `values` (a form's genres.data), in order, duplicates
+    # and anything else dropped
+    known = set(genre_id for genre_id, _ in genre_choices())
+    return [value for value in OrderedDict.fromkeys(values or ()) if value in known]
+
+
+def genre_ids_by_name(names):
+    # (ids, unknown names) for imports, which name their genres
+    ids = dict((name, genre_id) for genre_id, name in genre_choices())
+    return [ids[name] for name in names if name in ids], [name for name in names if name not in ids]
@@ -0,0 +1,117 @@
+import atexit, json, logging, queue, random, time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import g, request
+from flask.logging import default_handler
+from querystats import request_db_stats
+
+#----------------------------------------------------------------------------#
+# Structured, non-blocking logging.
+#----------------------------------------------------------------------------#
+
+# request threads only put records on a queue; a single listener thread does
+# the formatting and file I/O, so a slow disk doesn't show up in latency.
+
+class JsonFormatter(logging.Formatter):
+    # one JSON object per line. extra={'fields': {...}} adds keys to it.
+
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class DebugSampler(logging.Filter):
+    # passes every record above DEBUG and a `rate` fraction of DEBUG ones
+
+    def __init__(self, rate):
+        super(DebugSampler, self).__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+def _rotating_handler(path, config):
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=config.get('LOG_BACKUP_COUNT', 5)
+    )
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _start_listener(*handlers):
+    # a queue handler for the request threads, drained by one listener thread
+    records = queue.Queue(-1)
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return QueueHandler(records), listener
+
+
+def setup_slow_query_log(app):
+    # sends the slow query log to SLOW_QUERY_LOG as rotating JSON lines, in
+    # debug mode as well. replaces the handler of an earlier app, so creating
+    # apps repeatedly (tests, benchmarks) doesn't write every record twice.
+    slow_query_logger = logging.getLogger('fyyur.slow_query')
+    for handler in list(slow_query_logger.handlers):
+        if isinstance(handler, QueueHandler):
+            slow_query_logger.removeHandler(handler)
+
+    slow_query_log = app.config.get('SLOW_QUERY_LOG')
+    if not slow_query_log:
+        slow_query_logger.propagate = True
+        return None
+
+    queue_handler, listener = _start_listener(_rotating_handler(slow_query_log, app.config))
+    slow_query_logger.setLevel(logging.WARNING)
+    slow_query_logger.addHandler(queue_handler)
+    slow_query_logger.propagate = False
+    return listener
+
+
+def setup_logging(app):
+    # routes the app log through a queue to a rotating JSON-lines file, and
+    # logs the timing of every request.
+    app_handler = _rotating_handler(app.config.get('LOG_FILE', 'error.log'), app.config)
+    app_handler.addFilter(DebugSampler(app.config.get('LOG_DEBUG_SAMPLE_RATE', 0.01)))
+    queue_handler, listener = _start_listener(app_handler)
+
+    # flask's default handler writes to stderr synchronously from the request thread
+    app.logger.removeHandler(default_handler)
+    app.logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    app.logger.addHandler(queue_handler)
+
+    request_logger = app.logger.getChild('request')
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        queries, db_time = request_db_stats()
+        request_logger.info('%s %s %s', request.method, request.path, response.status_code, extra={'fields': {
+            "method": request.method,
+            "path": request.path,
+            "route": request.url_rule.rule if request.url_rule else None,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "db_queries": queries,
+            "db_ms": round(db_time * 1000, 2),
+        }})
+        return response
+
+    return listener
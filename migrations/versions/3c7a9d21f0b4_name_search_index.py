@@ -0,0 +1,57 @@
+"""name search index
+
+Revision ID: 3c7a9d21f0b4
+Revises: 84e95f893312
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7a9d21f0b4'
+down_revision = '84e95f893312'
+branch_labels = None
+depends_on = None
+
+
+def sqlite_name_fts(table):
+    # keep in sync with models.sqlite_name_fts
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        "name, content='{table}', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        "INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        "CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); END",
+        "CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name ON {table} BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); "
+        "INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+    return [statement.format(fts=table + '_fts', table=table) for statement in statements]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_venue_name_trgm ON venue USING gin (lower(name) gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_artist_name_trgm ON artist USING gin (lower(name) gin_trgm_ops)')
+    elif dialect == 'sqlite':
+        for table in ('venue', 'artist'):
+            for statement in sqlite_name_fts(table):
+                op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_artist_name_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_venue_name_trgm')
+    elif dialect == 'sqlite':
+        for table in ('venue', 'artist'):
+            for trigger in ('ai', 'ad', 'au'):
+                op.execute('DROP TRIGGER IF EXISTS {}_fts_{}'.format(table, trigger))
+            op.execute('DROP TABLE IF EXISTS {}_fts'.format(table))
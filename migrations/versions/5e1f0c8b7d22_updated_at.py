@@ -0,0 +1,27 @@
+"""updated_at on venue, artist and show
+
+Revision ID: 5e1f0c8b7d22
+Revises: 9b2e6f4d1a57
+Create Date: 2026-10-18 11:26:05.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1f0c8b7d22'
+down_revision = '9b2e6f4d1a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing rows get the migration time as their last modification
+    for table in ('venue', 'artist', 'show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()))
+
+
+def downgrade():
+    for table in ('show', 'artist', 'venue'):
+        op.drop_column(table, 'updated_at')
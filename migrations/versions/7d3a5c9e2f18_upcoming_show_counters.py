@@ -0,0 +1,45 @@
+"""upcoming show counters on venue and artist
+
+Revision ID: 7d3a5c9e2f18
+Revises: 5e1f0c8b7d22
+Create Date: 2026-10-18 20:02:41.318270
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3a5c9e2f18'
+down_revision = '5e1f0c8b7d22'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+
+    counter_sweep = op.create_table(
+        'counter_sweep',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('swept_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # backfill, counting from now as if a sweep had just run
+    now = datetime.now()
+    for table in ('venue', 'artist'):
+        op.execute(sa.text(
+            'UPDATE {table} SET upcoming_shows_count = ('
+            'SELECT count(*) FROM show '
+            'WHERE show.{table}_id = {table}.id AND show.start_time > :now)'.format(table=table)
+        ).bindparams(now=now))
+    op.bulk_insert(counter_sweep, [{'id': 1, 'swept_at': now}])
+
+
+def downgrade():
+    op.drop_table('counter_sweep')
+    for table in ('artist', 'venue'):
+        op.drop_column(table, 'upcoming_shows_count')
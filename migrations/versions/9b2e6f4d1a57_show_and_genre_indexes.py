@@ -0,0 +1,35 @@
+"""show and genre association indexes
+
+Revision ID: 9b2e6f4d1a57
+Revises: 3c7a9d21f0b4
+Create Date: 2026-10-18 10:03:17.552931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2e6f4d1a57'
+down_revision = '3c7a9d21f0b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # upcoming/past shows for a venue or an artist
+    op.create_index('ix_show_venue_id_start_time', 'show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_show_artist_id_start_time', 'show', ['artist_id', 'start_time'], unique=False)
+    # /shows keyset pagination on (start_time, id)
+    op.create_index('ix_show_start_time_id', 'show', ['start_time', 'id'], unique=False)
+    # venues/artists by genre; the primary keys only cover lookups by entity
+    op.create_index('ix_venue_genre_genre_id_venue_id', 'venue_genre', ['genre_id', 'venue_id'], unique=False)
+    op.create_index('ix_artist_genre_genre_id_artist_id', 'artist_genre', ['genre_id', 'artist_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_artist_genre_genre_id_artist_id', table_name='artist_genre')
+    op.drop_index('ix_venue_genre_genre_id_venue_id', table_name='venue_genre')
+    op.drop_index('ix_show_start_time_id', table_name='show')
+    op.drop_index('ix_show_artist_id_start_time', table_name='show')
+    op.drop_index('ix_show_venue_id_start_time', table_name='show')
@@ -1,15 +1,26 @@
-from app import db
+from datetime import datetime, timezone
+from sqlalchemy import event, DDL
+from extensions import db
+
+
+def utcnow():
+    # updated_at values: naive UTC with microseconds, set here rather than by
+    # the database, whose now() only has whole seconds on SQLite. two edits
+    # within a second must still give the page a new ETag.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 venue_genre = db.Table(
     'venue_genre',
     db.Column('venue_id', db.Integer, db.ForeignKey('venue.id'), primary_key=True),
-    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True)
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Index('ix_venue_genre_genre_id_venue_id', 'genre_id', 'venue_id')
 )
 
 artist_genre = db.Table(
     'artist_genre',
     db.Column('artist_id', db.Integer, db.ForeignKey('artist.id'), primary_key=True),
-    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True)    
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Index('ix_artist_genre_genre_id_artist_id', 'genre_id', 'artist_id')
 )
 
 class Genre(db.Model):
@@ -35,6 +46,9 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean, default=False, nullable=False)
     seeking_description = db.Column(db.String())
     website = db.Column(db.String(200))
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+    # maintained by counters.py, see there
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     genres = db.relationship('Genre', secondary=venue_genre, lazy=True, backref=db.backref('venues', lazy=True))
     shows = db.relationship('Show', backref="venue")
 
@@ -54,6 +68,9 @@ class Artist(db.Model):
     website = db.Column(db.String(200))
     seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String())
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+    # maintained by counters.py, see there
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     genres = db.relationship('Genre', secondary=artist_genre, lazy=True, backref=db.backref('artists', lazy=True))
     shows = db.relationship('Show', backref="artist")
 
@@ -68,3 +85,45 @@ class Show(db.Model):
     artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False, default=db.func.now())
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+    )
+
+class CounterSweep(db.Model):
+    # a single row: when the upcoming show counters were last swept
+    __tablename__ = 'counter_sweep'
+
+    id = db.Column(db.Integer, primary_key=True)
+    swept_at = db.Column(db.DateTime, nullable=False)
+
+
+# Name search. Postgres serves the LIKE searches from pg_trgm GIN indexes on
+# lower(name) (see migration 3c7a9d21f0b4). SQLite has no trigram indexes, so
+# it keeps an external-content FTS5 table per entity, synced by triggers.
+
+def sqlite_name_fts(table):
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        "name, content='{table}', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        "INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        "CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); END",
+        "CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name ON {table} BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); "
+        "INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+    return [statement.format(fts=table + '_fts', table=table) for statement in statements]
+
+for model in (Venue, Artist):
+    for statement in sqlite_name_fts(model.__tablename__):
+        event.listen(model.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    event.listen(
+        model.__table__, 'before_drop',
+        DDL("DROP TABLE IF EXISTS {}_fts".format(model.__tablename__)).execute_if(dialect='sqlite')
+    )
@@ -0,0 +1,342 @@
+import hashlib
+from datetime import datetime, timezone
+from itertools import groupby
+from sqlalchemy import func, select, table, column, literal_column, tuple_
+from sqlalchemy.orm import selectinload
+from extensions import db
+from models import Venue, Artist, Show, Genre, venue_genre, artist_genre
+
+SEARCH_PAGE_SIZE = 20
+SHOWS_PAGE_SIZE = 30
+PAST_SHOWS_LIMIT = 30
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+def venue_areas_statement():
+    # every venue with its number of upcoming shows, read from the
+    # venue.upcoming_shows_count counter (see counters.py), in area order
+    return select(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.upcoming_shows_count.label('num_upcoming_shows')
+    ).order_by(Venue.state, func.lower(Venue.city), Venue.name)
+
+def group_areas(rows):
+    areas = []
+    for (state, _), venues in groupby(rows, key=lambda row: (row.state, row.city.lower())):
+        venues = list(venues)
+        areas.append({
+            "city": venues[0].city,
+            "state": state,
+            "venues": [
+                {
+                    "id": venue.id,
+                    "name": venue.name,
+                    "num_upcoming_shows": venue.num_upcoming_shows
+                }
+                for venue in venues
+            ]
+        })
+
+    return areas
+
+def venue_areas():
+    # venues grouped by city/state, each with its number of upcoming shows
+    return group_areas(db.session.execute(venue_areas_statement()).all())
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+def artist_names_statement():
+    return select(Artist.id, Artist.name).order_by(Artist.id)
+
+def artist_names():
+    # id and name of every artist, for the /artists listing
+    return [row._asdict() for row in db.session.execute(artist_names_statement())]
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+def _name_search(query, model, search_str):
+    # filter and rank `query` by a case-insensitive partial match on model.name.
+    # postgres uses the pg_trgm index on lower(name) and ranks by similarity,
+    # sqlite matches through the <table>_fts trigram index and ranks by bm25.
+    term = search_str.lower()
+    name = func.lower(model.name)
+    dialect = db.engine.dialect.name
+
+    if dialect == 'postgresql':
+        return query.filter(name.like("%{}%".format(term))) \
+            .order_by(func.similarity(name, term).desc(), model.name, model.id)
+
+    # the trigram tokenizer can only match terms of three or more characters
+    if dialect == 'sqlite' and len(term) >= 3:
+        fts = table(model.__tablename__ + '_fts', column('rowid'), column('rank'))
+        phrase = '"{}"'.format(term.replace('"', '""'))
+        matches = select(fts.c.rowid, fts.c.rank) \
+            .where(literal_column(fts.name).op('MATCH')(phrase)) \
+            .subquery()
+        return query.join(matches, matches.c.rowid == model.id) \
+            .order_by(matches.c.rank, model.name, model.id)
+
+    return query.filter(name.like("%{}%".format(term))) \
+        .order_by(func.instr(name, term), model.name, model.id)
+
+def search_results(model, search_str, page=1, per_page=SEARCH_PAGE_SIZE):
+    # case-insensitive partial name match on Venue or Artist, best matches first,
+    # one page at a time. matches, their upcoming show counts and the total
+    # number of matches all come back from one statement. `pages` is the
+    # number of pages the matches fill.
+    page = max(page, 1)
+
+    query = db.session.query(
+        model.id,
+        model.name,
+        model.upcoming_shows_count.label('num_upcoming_shows'),
+        func.count().over().label('total')
+    )
+
+    rows = _name_search(query, model, search_str) \
+        .limit(per_page) \
+        .offset((page - 1) * per_page) \
+        .all()
+
+    if rows:
+        count = rows[0].total
+    elif page > 1:
+        count = _name_search(db.session.query(model.id), model, search_str) \
+            .order_by(None).count()
+    else:
+        count = 0
+
+    return {
+        "count": count,
+        "page": page,
+        "pages": -(-count // per_page),
+        "data": [
+            {
+                "id": row.id,
+                "name": row.name,
+                "num_upcoming_shows": row.num_upcoming_shows
+            }
+            for row in rows
+        ]
+    }
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+def encode_cursor(start_time, show_id):
+    return "{}_{}".format(start_time.isoformat(), show_id)
+
+def decode_cursor(cursor):
+    # returns (start_time, id), or None for a missing or malformed cursor
+    try:
+        start_time, show_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(start_time), int(show_id)
+    except (AttributeError, ValueError):
+        return None
+
+def show_listing_statement(past=False, cursor=None, per_page=SHOWS_PAGE_SIZE, now=None):
+    # one page of shows joined with their artist and venue, selecting only the
+    # columns pages/shows.html uses, plus one row to tell if there is a next page.
+    # upcoming shows run soonest first, past shows most recent first. pages are
+    # keyed on (start_time, id) so deep pages cost the same as the first one.
+    now = now or datetime.now()
+    key = tuple_(Show.start_time, Show.id)
+
+    query = select(
+        Show.id,
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Venue.id == Show.venue_id) \
+     .join(Artist, Artist.id == Show.artist_id)
+
+    after = decode_cursor(cursor)
+    if past:
+        query = query.where(Show.start_time <= now) \
+            .order_by(Show.start_time.desc(), Show.id.desc())
+        if after:
+            query = query.where(key < tuple_(*after))
+    else:
+        query = query.where(Show.start_time > now) \
+            .order_by(Show.start_time, Show.id)
+        if after:
+            query = query.where(key > tuple_(*after))
+
+    return query.limit(per_page + 1)
+
+def show_page(rows, per_page=SHOWS_PAGE_SIZE):
+    # (rows, next_cursor) from the rows of show_listing_statement()
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        return rows, encode_cursor(rows[-1].start_time, rows[-1].id)
+    return rows, None
+
+def show_listing(past=False, cursor=None, per_page=SHOWS_PAGE_SIZE, now=None):
+    # one page of shows and the cursor of the next one (None on the last page)
+    rows = db.session.execute(show_listing_statement(past, cursor, per_page, now)).all()
+    return show_page(rows, per_page)
+
+#----------------------------------------------------------------------------#
+# Venue and artist pages.
+#----------------------------------------------------------------------------#
+
+def get_with_genres(model, entity_id):
+    # loads a Venue or Artist together with its genres in two statements
+    return model.query.options(selectinload(model.genres)).get(entity_id)
+
+def entity_statement(model, entity_id):
+    # a venue's or artist's columns as a plain row, for the async pages
+    return select(*model.__table__.c).where(model.id == entity_id)
+
+def genre_names_statement(model, entity_id):
+    # names of a venue's or artist's genres, without loading the entity
+    association = venue_genre if model is Venue else artist_genre
+    fk = association.c.venue_id if model is Venue else association.c.artist_id
+    return select(Genre.name) \
+        .join(association, association.c.genre_id == Genre.id) \
+        .where(fk == entity_id)
+
+def entity_show_statements(model, entity_id, past_limit=PAST_SHOWS_LIMIT, now=None):
+    # (counts, upcoming, past) statements for a venue's or artist's shows. they
+    # don't depend on each other, so they can run in any order or at once.
+    now = now or datetime.now()
+    if model is Venue:
+        show_fk, other_fk, other, prefix = Show.venue_id, Show.artist_id, Artist, 'artist'
+    else:
+        show_fk, other_fk, other, prefix = Show.artist_id, Show.venue_id, Venue, 'venue'
+
+    counts = select(
+        func.count(Show.id).filter(Show.start_time > now).label('upcoming'),
+        func.count(Show.id).filter(Show.start_time <= now).label('past')
+    ).where(show_fk == entity_id)
+
+    query = select(
+        Show.start_time,
+        other.id.label(prefix + '_id'),
+        other.name.label(prefix + '_name'),
+        other.image_link.label(prefix + '_image_link')
+    ).join(other, other.id == other_fk) \
+     .where(show_fk == entity_id)
+
+    upcoming = query.where(Show.start_time > now) \
+        .order_by(Show.start_time, Show.id)
+    past = query.where(Show.start_time <= now) \
+        .order_by(Show.start_time.desc(), Show.id.desc()) \
+        .limit(past_limit)
+
+    return counts, upcoming, past
+
+def shows_result(counts, upcoming_shows, past_shows):
+    return {
+        "past_shows": [row._asdict() for row in past_shows],
+        "upcoming_shows": [row._asdict() for row in upcoming_shows],
+        "past_shows_count": counts.past,
+        "upcoming_shows_count": counts.upcoming
+    }
+
+def entity_shows(model, entity_id, past_limit=PAST_SHOWS_LIMIT, now=None):
+    # past and upcoming shows for a venue (listing its artists) or an artist
+    # (listing its venues). upcoming shows are returned in full, past shows
+    # are capped at the most recent `past_limit`; both counts come from COUNT.
+    counts, upcoming, past = entity_show_statements(model, entity_id, past_limit, now)
+
+    counts = db.session.execute(counts).one()
+    upcoming_shows = db.session.execute(upcoming).all() if counts.upcoming else []
+    past_shows = db.session.execute(past).all() if counts.past else []
+
+    return shows_result(counts, upcoming_shows, past_shows)
+
+def show_partner_ids(model, entity_id):
+    # ids of the artists that played a venue, or of the venues an artist played
+    if model is Venue:
+        show_fk, other_fk = Show.venue_id, Show.artist_id
+    else:
+        show_fk, other_fk = Show.artist_id, Show.venue_id
+    return [row[0] for row in db.session.query(other_fk).filter(show_fk == entity_id).distinct()]
+
+def page_validators(model, entity_id, now=None):
+    # (etag, last_modified) for a venue or artist page, or None if there is no
+    # such entity. one aggregate statement covers everything the page shows:
+    # the entity, its shows, the artists/venues on them, and which shows have
+    # already started (pages change as shows move from upcoming to past).
+    now = now or datetime.now()
+    if model is Venue:
+        show_fk, other_fk, other = Show.venue_id, Show.artist_id, Artist
+    else:
+        show_fk, other_fk, other = Show.artist_id, Show.venue_id, Venue
+
+    row = db.session.query(
+        model.updated_at,
+        func.count(Show.id),
+        func.count(Show.id).filter(Show.start_time > now),
+        func.max(Show.updated_at),
+        func.max(other.updated_at),
+        func.max(Show.start_time).filter(Show.start_time <= now)
+    ).outerjoin(Show, show_fk == model.id) \
+     .outerjoin(other, other.id == other_fk) \
+     .filter(model.id == entity_id) \
+     .group_by(model.id) \
+     .first()
+
+    if row is None:
+        return None
+
+    etag = hashlib.sha1(repr((model.__tablename__, entity_id) + tuple(row)).encode('utf-8')).hexdigest()
+    # updated_at is naive UTC (see models.utcnow); start times are
+    # local wall-clock times, like `now`. compare them all as aware UTC times.
+    changed = [value.replace(tzinfo=timezone.utc) for value in (row[0], row[3], row[4]) if value is not None]
+    if row[5] is not None:
+        changed.append(row[5].astimezone(timezone.utc))
+    return etag, max(changed)
+
+#----------------------------------------------------------------------------#
+# Listings and exports.
+#----------------------------------------------------------------------------#
+
+def entity_listing(model, after=None, per_page=SHOWS_PAGE_SIZE):
+    # one page of venues or artists ordered by id, with their upcoming show
+    # counts. returns (rows, next_after) where next_after is None on the last page.
+    columns = [column for column in model.__table__.c if column.name not in ('updated_at', 'upcoming_shows_count')]
+
+    query = db.session.query(
+        *columns,
+        model.upcoming_shows_count.label('num_upcoming_shows')
+    ).order_by(model.id)
+    if after is not None:
+        query = query.filter(model.id > after)
+
+    rows = query.limit(per_page + 1).all()
+    if len(rows) > per_page:
+        return rows[:per_page], rows[per_page - 1].id
+    return rows, None
+
+def stream_table(table, since=None, chunk_size=1000):
+    # every row of `table` as a mapping, fetched through a server-side cursor
+    # `chunk_size` rows at a time, so memory stays flat however large it is.
+    # with `since`, only rows modified at or after it: genre association rows
+    # follow the updated_at of their venue/artist.
+    query = select(table).order_by(*table.primary_key.columns)
+    if since is not None:
+        if 'updated_at' in table.c:
+            query = query.where(table.c.updated_at >= since)
+        elif 'venue_id' in table.c:
+            query = query.where(table.c.venue_id.in_(select(Venue.id).where(Venue.updated_at >= since)))
+        elif 'artist_id' in table.c:
+            query = query.where(table.c.artist_id.in_(select(Artist.id).where(Artist.updated_at >= since)))
+
+    result = db.session.execute(query, execution_options={"yield_per": chunk_size})
+    for row in result.mappings():
+        yield row
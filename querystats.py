@@ -0,0 +1,93 @@
+import logging, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from flask import current_app, g, has_request_context, request
+
+#----------------------------------------------------------------------------#
+# Per-request SQL statistics.
+#----------------------------------------------------------------------------#
+
+slow_query_logger = logging.getLogger('fyyur.slow_query')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def request_db_stats():
+    # (statement count, seconds spent in the database) for the current request
+    if not has_request_context():
+        return 0, 0.0
+    return g.get('db_queries', 0), g.get('db_time', 0.0)
+
+
+class QueryStats(object):
+    # counts the statements each request runs and the time they take, logs
+    # statements slower than SLOW_QUERY_MS with their route, and checks views
+    # against the query budgets declared with @query_stats.budget(n).
+    #
+    # SQL_STATS_HEADERS adds X-DB-Queries / X-DB-Time (ms) to every response.
+    # SQL_QUERY_BUDGET_STRICT raises QueryBudgetExceeded instead of logging a
+    # warning when a view goes over its budget; meant for test runs.
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+        app.after_request(self._after_request)
+        app.extensions['query_stats'] = self
+
+    def budget(self, limit):
+        # the most statements a view may run per request
+        def decorator(view):
+            view.query_budget = limit
+            return view
+        return decorator
+
+    def _after_request(self, response):
+        queries, seconds = request_db_stats()
+
+        if current_app.config.get('SQL_STATS_HEADERS'):
+            response.headers['X-DB-Queries'] = str(queries)
+            response.headers['X-DB-Time'] = '{:.2f}'.format(seconds * 1000)
+
+        view = current_app.view_functions.get(request.endpoint)
+        limit = getattr(view, 'query_budget', None)
+        if limit is not None and queries > limit:
+            message = '{} ran {} statements, over its budget of {}'.format(request.endpoint, queries, limit)
+            if current_app.config.get('SQL_QUERY_BUDGET_STRICT'):
+                raise QueryBudgetExceeded(message)
+            current_app.logger.warning(message)
+
+        return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if not has_request_context():
+        return
+
+    g.db_queries = g.get('db_queries', 0) + 1
+    g.db_time = g.get('db_time', 0.0) + elapsed
+
+    if 'query_stats' in current_app.extensions \
+            and elapsed * 1000 >= current_app.config.get('SLOW_QUERY_MS', 200):
+        slow_query_logger.warning(
+            '%.1fms %s %s', elapsed * 1000, request.method, request.path,
+            extra={'fields': {
+                "method": request.method,
+                "path": request.path,
+                "route": request.url_rule.rule if request.url_rule else None,
+                "duration_ms": round(elapsed * 1000, 2),
+                "statement": ' '.join(statement.split()),
+            }}
+        )
@@ -0,0 +1,165 @@
+import contextvars, itertools, threading, time
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#----------------------------------------------------------------------------#
+
+# the replicas are the SQLALCHEMY_BINDS named replica0, replica1, ... (see
+# dbpool.replica_binds). each GET/HEAD request picks the next healthy one,
+# round-robin, and db.session runs its SELECTs there for the whole request.
+# everything else (writes, flushes, ORM bulk inserts, which bind without a
+# statement) and other methods go to the primary, and so do all reads when
+# every replica is down. so does work in a primary_request_context(), which
+# the flask fyyur commands use for url_for and the forms.
+#
+# a request that commits a write marks the browser's session, so its requests
+# read from the primary for REPLICA_STICKY_SECONDS: the redirect after editing
+# a venue shows the edit even if the replicas haven't caught up. read-only
+# POSTs, like the searches, leave the session alone. other visitors may see
+# the old data until the replicas catch up, and so may pages they put in the
+# page cache.
+
+REPLICA_PREFIX = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+STICKY_KEY = '_read_primary_until'
+PRIMARY_ONLY = 'fyyur.primary_only'
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and getattr(clause, 'is_select', False):
+            replica = request_replica()
+            if replica is not None:
+                return replica
+        return super(RoutingSession, self).get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+# db.session notes that it wrote something (a flush, or an INSERT/UPDATE/DELETE
+# run through it) and, when that is committed, flags the request in g.
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _committed(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        g.db_committed_write = True
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _rolled_back(session):
+    session.info.pop('wrote', None)
+
+
+def request_replica():
+    # the replica engine the current request reads from, or None for the primary
+    if not has_request_context():
+        return None
+    replica_set = current_app.extensions.get('replicas')
+    if replica_set is None:
+        return None
+    if 'db_replica' not in g:
+        g.db_replica = replica_set.choose()
+    return g.db_replica
+
+
+def primary_request_context(app):
+    # a request context for work outside a real request, which never reads
+    # from a replica: what it writes and reads back must stay on the primary
+    return app.test_request_context(environ_overrides={PRIMARY_ONLY: True})
+
+
+class ReplicaSet(object):
+    # one app's replicas and what is known of their health
+
+    def __init__(self, db, keys, check_interval=10, sticky_seconds=5):
+        self.db = db
+        self.keys = keys
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self._cycle = itertools.cycle(keys)
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        # the next healthy replica for this request, or None to read from the primary
+        if not self.keys or request.method not in READ_METHODS or request.environ.get(PRIMARY_ONLY):
+            return None
+        if session.get(STICKY_KEY, 0) > time.time():
+            return None
+
+        for _ in range(len(self.keys)):
+            with self._lock:
+                key = next(self._cycle)
+            if self.healthy(key):
+                return self.db.engines[key]
+        return None
+
+    def healthy(self, key):
+        # whether `key` answered its last check, checking again when that is
+        # more than REPLICA_CHECK_INTERVAL old. a replica that has never been
+        # checked counts as up until its first check completes, so a slow
+        # check holds up one request per interval, not all of them.
+        now = time.monotonic()
+        with self._lock:
+            up, checked_at = self._health.get(key, (True, None))
+            due = checked_at is None or now - checked_at >= self.check_interval
+            if due:
+                self._health[key] = (up, now)
+        if not due:
+            return up
+
+        # run outside the request's context, so the check doesn't count
+        # against the view's query budget
+        up = contextvars.Context().run(self.check, self.db.engines[key])
+        with self._lock:
+            self._health[key] = (up, now)
+        if not up:
+            current_app.logger.warning('read replica %s failed its health check', key)
+        return up
+
+    def check(self, engine):
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            return True
+        except SQLAlchemyError:
+            return False
+
+
+class ReplicaRouter(object):
+    # keeps each app's ReplicaSet in app.extensions['replicas']
+
+    def __init__(self, db, app=None):
+        self.db = db
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        keys = sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {}
+                      if key.startswith(REPLICA_PREFIX))
+        app.extensions['replicas'] = ReplicaSet(
+            self.db, keys,
+            check_interval=app.config.get('REPLICA_CHECK_INTERVAL', 10),
+            sticky_seconds=app.config.get('REPLICA_STICKY_SECONDS', 5)
+        )
+        app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        replica_set = current_app.extensions['replicas']
+        if replica_set.keys and g.get('db_committed_write') and response.status_code < 500:
+            session[STICKY_KEY] = time.time() + replica_set.sticky_seconds
+        return response
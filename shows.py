@@ -0,0 +1,88 @@
+from flask import Blueprint, render_template, request, flash, url_for
+from extensions import db, page_cache, query_stats, async_db
+from forms import ShowForm
+from models import Venue, Artist, Show
+from queries import show_listing
+from counters import adjust_upcoming_counts
+import async_queries
+
+#----------------------------------------------------------------------------#
+# Show pages.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('shows', __name__)
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@blueprint.route('/shows')
+@query_stats.budget(1)
+@page_cache.cached
+def shows():
+  # displays list of shows at /shows, upcoming by default (?past=1 for past shows)
+  past = request.args.get('past', 0, type=int) == 1
+  cursor = request.args.get('cursor')
+  if async_db.enabled:
+    rows, next_cursor = async_db.run(async_queries.show_listing(past=past, cursor=cursor))
+  else:
+    rows, next_cursor = show_listing(past=past, cursor=cursor)
+
+  data = [
+    {
+      "venue_id": row.venue_id,
+      "venue_name": row.venue_name,
+      "artist_id": row.artist_id,
+      "artist_name": row.artist_name,
+      "artist_image_link": row.artist_image_link,
+      "start_time": row.start_time
+    }
+    for row in rows
+  ]
+
+  if len(data) == 0 and cursor is None:
+    flash("There are no shows to list.")
+
+  return render_template('pages/shows.html', shows=data, past=past, next_cursor=next_cursor)
+
+@blueprint.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@blueprint.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # TODO: insert form data as a new Show record in the db, instead
+  form = ShowForm(request.form)
+
+  # Query DB if the provided artist and venue exist
+  venue = Venue.query.get(form.venue_id.data)
+  artist = Artist.query.get(form.artist_id.data)
+
+  if venue and artist:
+    show = Show(
+      artist_id = form.artist_id.data,
+      venue_id = form.venue_id.data,
+      start_time = form.start_time.data
+    )
+
+    db.session.add(show)
+    adjust_upcoming_counts(show.venue_id, show.artist_id, show.start_time, 1)
+    db.session.commit()
+    page_cache.invalidate(
+      url_for('venues.venues'),
+      url_for('venues.show_venue', venue_id=venue.id),
+      url_for('artists.show_artist', artist_id=artist.id),
+      url_for('shows.shows')
+    )
+
+    flash('Show was successfully listed!')
+  else:
+    flash('An error occurred. Show could not be listed.')
+  # on successful db insert, flash success
+  
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Show could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  return render_template('pages/home.html')
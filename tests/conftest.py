@@ -0,0 +1,67 @@
+import os, tempfile
+from types import SimpleNamespace
+import pytest
+
+# the app reads its configuration from the environment at import time
+os.environ.update(
+    DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db'),
+    DATABASE_REPLICA_URLS='',
+    PAGE_CACHE_TYPE='null',
+    ASYNC_READS='0',
+    SQL_STATS_HEADERS='1',
+    SQL_QUERY_BUDGET_STRICT='1',
+    SLOW_QUERY_LOG='',
+)
+
+import config
+from app import create_app
+from extensions import db as _db
+from genres import clear_genre_cache
+from benchmarks.seed import seed
+
+
+def make_app(cli=False, **overrides):
+    # an app on config.py's settings with `overrides` applied
+    settings = dict((key, getattr(config, key)) for key in dir(config) if key.isupper())
+    settings.update(overrides, TESTING=True, WTF_CSRF_ENABLED=False)
+    return create_app(SimpleNamespace(**settings), cli=cli)
+
+
+@pytest.fixture(scope='session')
+def app():
+    return make_app()
+
+
+def reset_schema(app):
+    with app.app_context():
+        _db.drop_all(bind_key=None)
+        _db.create_all(bind_key=None)
+    clear_genre_cache()
+
+
+@pytest.fixture
+def db(app):
+    # an empty schema for every test. no app context stays pushed: requests
+    # would share it, and with it flask.g and the per-request query counts.
+    reset_schema(app)
+    return _db
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture
+def seeded(app, db):
+    # seeded(venues=..., artists=..., shows=...) fills the empty schema once
+    # and returns what benchmarks.seed.seed returns
+    def seeded(**counts):
+        with app.app_context(), db.engine.begin() as connection:
+            return seed(connection, **counts)
+    return seeded
+
+
+def query_count(response):
+    assert response.status_code == 200, response.status_code
+    return int(response.headers['X-DB-Queries'])
@@ -0,0 +1,110 @@
+import json, time, tracemalloc
+from api import API_MAX_PAGE_SIZE
+
+
+def walk(client, path, **params):
+    # every page of a listing, following next_cursor from the first page
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, cursor=cursor) if cursor is not None else params
+        body = client.get(path, query_string=query).get_json()
+        pages.append(body['data'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_venue_pages_cover_every_venue_once(client, seeded):
+    seeded(venues=25, artists=5, shows=10)
+    pages = walk(client, '/api/v1/venues', limit=10)
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [row['id'] for page in pages for row in page] == list(range(1, 26))
+
+
+def test_last_page_has_no_cursor(client, seeded):
+    seeded(venues=10, artists=5, shows=10)
+    body = client.get('/api/v1/artists', query_string={'limit': 5}).get_json()
+    last = client.get('/api/v1/artists', query_string={'limit': 5, 'cursor': body['next_cursor']}).get_json()
+
+    assert len(last['data']) == 5
+    assert last['next_cursor'] is None
+
+
+def test_bad_cursor_starts_from_the_first_page(client, seeded):
+    seeded(venues=10, artists=5, shows=20)
+    for path, cursor in [('/api/v1/venues', 'abc'), ('/api/v1/shows', 'abc'), ('/api/v1/shows', 'abc_def')]:
+        first = client.get(path, query_string={'limit': 3}).get_json()
+        bad = client.get(path, query_string={'limit': 3, 'cursor': cursor}).get_json()
+        assert bad == first
+
+
+def test_show_pages_cover_every_show_once(client, seeded):
+    seeded(venues=5, artists=5, shows=40)
+    ids = [row['id'] for past in (0, 1) for page in walk(client, '/api/v1/shows', limit=7, past=past) for row in page]
+
+    assert sorted(ids) == list(range(1, 41))
+
+
+def test_limit_is_capped(client, seeded):
+    seeded(venues=1200, artists=5, shows=10)
+    capped = client.get('/api/v1/venues', query_string={'limit': 5000}).get_json()
+    assert len(capped['data']) == 1000
+    assert capped['next_cursor'] == 1000
+
+    for limit in (0, -3):
+        assert len(client.get('/api/v1/venues', query_string={'limit': limit}).get_json()['data']) == 1
+
+
+def test_export_streams_every_row(client, seeded):
+    # more rows than stream_table fetches per chunk
+    seeded(venues=5, artists=5, shows=2500)
+    response = client.get('/api/v1/export/shows.ndjson')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(row['id'] for row in rows) == list(range(1, 2501))
+
+
+def test_export_of_unknown_table_is_not_found(client, db):
+    response = client.get('/api/v1/export/secrets.ndjson')
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "not found"}
+
+
+def test_full_page_stays_small(client, seeded):
+    seeded(venues=1200, artists=5, shows=10)
+    response = client.get('/api/v1/venues', query_string={'limit': API_MAX_PAGE_SIZE})
+
+    assert len(response.get_json()['data']) == API_MAX_PAGE_SIZE
+    assert b'\n' not in response.data.rstrip()
+    assert len(response.data) <= 300 * API_MAX_PAGE_SIZE
+
+
+def read_export(client, name):
+    # (lines, seconds to the first line, seconds in all, peak bytes allocated)
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get('/api/v1/export/{}.ndjson'.format(name), buffered=False)
+    lines = iter(response.response)
+    next(lines)
+    first = time.perf_counter() - started
+    count = 1 + sum(1 for _ in lines)
+    total = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    response.close()
+    return count, first, total, peak
+
+
+def test_large_export_streams_in_flat_memory(client, seeded):
+    seeded(venues=50, artists=50, shows=20000)
+    count, first, total, peak = read_export(client, 'shows')
+
+    assert count == 20000
+    # the export holds one chunk at a time, not the ~2 MB of NDJSON it sends
+    assert peak < 1024 * 1024
+    assert first < 1
+    assert total < 20
@@ -0,0 +1,17 @@
+from cache import LocalCache, NullCache
+from extensions import page_cache, async_db
+from tests.conftest import make_app
+
+
+def test_apps_keep_their_own_extension_state(app, client):
+    other = make_app(PAGE_CACHE_TYPE='local', SQL_STATS_HEADERS=False, ASYNC_READS=True)
+
+    with app.app_context():
+        assert isinstance(page_cache.backend, NullCache)
+        assert not async_db.enabled
+    with other.app_context():
+        assert isinstance(page_cache.backend, LocalCache)
+        assert async_db.enabled
+
+    assert 'X-DB-Queries' in client.get('/').headers
+    assert 'X-DB-Queries' not in other.test_client().get('/').headers
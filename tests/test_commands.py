@@ -0,0 +1,68 @@
+import json
+import pytest
+from extensions import db as _db
+from models import Venue, Show
+from tests.conftest import make_app
+
+
+@pytest.fixture
+def cli_app(db):
+    return make_app(cli=True)
+
+
+def run_import(cli_app, tmp_path, kind, name, text, *options):
+    source = tmp_path / name
+    source.write_text(text)
+    errors = tmp_path / 'rejected.ndjson'
+    result = cli_app.test_cli_runner().invoke(args=[
+        'fyyur', 'import', kind, str(source), '--errors', str(errors)
+    ] + list(options))
+    assert result.exit_code == 0, result.output
+    rejects = [json.loads(line) for line in errors.read_text().splitlines()] if errors.exists() else []
+    return result, rejects
+
+
+def venue(name, **fields):
+    return json.dumps(dict({
+        'name': name, 'city': 'Springfield', 'state': 'CA', 'address': '1 Main St',
+        'phone': '555-000-0000', 'facebook_link': 'https://www.facebook.com/' + name.replace(' ', ''),
+        'genres': ['Jazz'],
+    }, **fields))
+
+
+def test_bad_ndjson_lines_are_rejected_and_the_rest_imported(cli_app, tmp_path):
+    lines = [venue('The First Hall'), '{"name": ', '[1, 2]', venue('The Second Hall'),
+             venue('The Third Hall', genres=['Polka']), '', venue('The Fourth Hall')]
+    result, rejects = run_import(cli_app, tmp_path, 'venues', 'venues.ndjson', '\n'.join(lines) + '\n',
+                                 '--chunk-size', '2')
+
+    assert '6 read, 3 imported, 3 rejected' in result.output
+    assert [reject['line'] for reject in rejects] == [2, 3, 5]
+    assert rejects[0]['row'] == '{"name": ' and rejects[0]['errors'].startswith('invalid JSON')
+    assert rejects[1]['errors'] == 'not a JSON object'
+    assert 'unknown genres: Polka' in rejects[2]['errors']['genres']
+    with cli_app.app_context():
+        assert sorted(v.name for v in Venue.query) == ['The First Hall', 'The Fourth Hall', 'The Second Hall']
+        assert all(len(v.genres) == 1 for v in Venue.query)
+
+
+def test_csv_import(cli_app, tmp_path):
+    result, rejects = run_import(cli_app, tmp_path, 'artists', 'artists.csv',
+                                 'name,city,state,phone,genres,facebook_link\n'
+                                 'The Band,Salem,OR,555-000-0000,"Jazz, Blues",https://www.facebook.com/band\n'
+                                 ',Salem,OR,555-000-0000,Jazz,https://www.facebook.com/nameless\n')
+
+    assert '2 read, 1 imported, 1 rejected' in result.output
+    assert rejects[0]['line'] == 3 and 'name' in rejects[0]['errors']
+
+
+def test_shows_must_reference_existing_venues_and_artists(cli_app, seeded, tmp_path):
+    seeded(venues=2, artists=2, shows=0)
+    lines = [json.dumps({'venue_id': 1, 'artist_id': 2, 'start_time': '2030-01-01 20:00:00'}),
+             json.dumps({'venue_id': 9, 'artist_id': 2, 'start_time': '2030-01-01 20:00:00'})]
+    result, rejects = run_import(cli_app, tmp_path, 'shows', 'shows.ndjson', '\n'.join(lines) + '\n')
+
+    assert [reject['line'] for reject in rejects] == [2]
+    with cli_app.app_context():
+        assert _db.session.query(Show).count() == 1
+        assert _db.session.get(Venue, 1).upcoming_shows_count == 1
@@ -0,0 +1,26 @@
+ARTIST = {
+    'name': 'The Test Band', 'city': 'Springfield', 'state': 'CA', 'phone': '555-000-0000',
+    'facebook_link': 'https://www.facebook.com/test', 'genres': ['1'],
+}
+
+
+def test_unchanged_page_is_not_modified(client, seeded):
+    seeded(venues=2, artists=2, shows=10)
+    first = client.get('/artists/1')
+    assert first.status_code == 200 and first.headers['ETag']
+
+    again = client.get('/artists/1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_every_edit_changes_the_etag(client, db):
+    client.post('/artists/create', data=ARTIST)
+    etags = [client.get('/artists/1').headers['ETag']]
+    # edits within the same second, one of them changing only the genres
+    for genres in (['2'], ['2', '3'], ['3']):
+        client.post('/artists/1/edit', data=dict(ARTIST, genres=genres))
+        etags.append(client.get('/artists/1').headers['ETag'])
+
+    assert len(set(etags)) == len(etags)
+    stale = client.get('/artists/1', headers={'If-None-Match': etags[0]})
+    assert stale.status_code == 200
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+import counters
+from extensions import db
+from models import Venue, Artist, CounterSweep
+
+
+def create_show(client, start_time):
+    return client.post('/shows/create', data={
+        'venue_id': '1', 'artist_id': '1', 'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+
+def test_show_started_since_the_last_sweep_does_not_drift(app, client, seeded):
+    seeded(venues=2, artists=2, shows=0)
+    with app.app_context():
+        counters.sweep(now=datetime.now() - timedelta(hours=1))
+
+    create_show(client, datetime.now() - timedelta(minutes=1))
+    create_show(client, datetime.now() - timedelta(hours=2))
+    create_show(client, datetime.now() + timedelta(days=1))
+
+    with app.app_context():
+        assert counters.drift(Venue) == [] and counters.drift(Artist) == []
+        assert db.session.get(Venue, 1).upcoming_shows_count == 2
+        # the next sweep drops the show that has started
+        counters.sweep()
+        assert db.session.get(Venue, 1).upcoming_shows_count == 1
+
+
+def test_counts_before_the_first_sweep_are_relative_to_now(app, client, seeded):
+    seeded(venues=2, artists=2, shows=0)
+    with app.app_context():
+        db.session.query(CounterSweep).delete()
+        db.session.commit()
+    create_show(client, datetime.now() - timedelta(minutes=1))
+    create_show(client, datetime.now() + timedelta(days=1))
+
+    with app.app_context():
+        assert counters.drift(Venue) == []
+        assert db.session.get(Artist, 1).upcoming_shows_count == 1
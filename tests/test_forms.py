@@ -0,0 +1,21 @@
+from forms import VenueForm, ArtistForm
+from genres import choice_ids
+
+
+def test_bad_genre_values_are_dropped_one_by_one(app, db):
+    for form_class in (VenueForm, ArtistForm):
+        with app.test_request_context(method='POST', data={'genres': ['1', '2', 'abc', '', '2']}):
+            form = form_class()
+            assert form.genres.data == [1, 2, 2]
+            assert choice_ids(form.genres.data) == [1, 2]
+
+
+def test_artist_keeps_its_valid_genres(app, client, db):
+    response = client.post('/artists/create', data={
+        'name': 'The Test Band', 'city': 'Springfield', 'state': 'CA', 'phone': '555-000-0000',
+        'facebook_link': 'https://www.facebook.com/test', 'genres': ['1', '2', 'abc'],
+    })
+    assert response.status_code == 200
+
+    body = client.get('/api/v1/artists/1').get_json()
+    assert len(body['genres']) == 2
@@ -0,0 +1,80 @@
+import shutil, sqlite3
+import pytest
+from dbpool import replica_binds
+from extensions import db
+from genres import clear_genre_cache
+from tests.conftest import make_app
+
+# a SQLite primary and a copy of it standing in for a read replica that
+# hasn't caught up: rows only in the replica show which database served a read
+
+VENUE = {
+    'name': 'The Primary Hall', 'city': 'Springfield', 'state': 'CA', 'address': '1 Main St',
+    'phone': '555-000-0000', 'facebook_link': 'https://www.facebook.com/primary', 'genres': ['1'],
+}
+
+
+def count(path, table):
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT count(*) FROM ' + table).fetchone()[0]
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary, replica = str(tmp_path / 'primary.db'), str(tmp_path / 'replica.db')
+    app = make_app(
+        cli=True,
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + primary,
+        SQLALCHEMY_BINDS=replica_binds(['sqlite:///' + replica]),
+        REPLICA_STICKY_SECONDS=60,
+    )
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.engine.dispose()
+    clear_genre_cache()
+    shutil.copy(primary, replica)
+    with sqlite3.connect(replica) as connection:
+        connection.execute("INSERT INTO venue (name, city, state, address, phone, seeking_talent, upcoming_shows_count, updated_at) "
+                           "VALUES ('The Replica Room', 'Salem', 'OR', '2 Main St', '555', 0, 0, CURRENT_TIMESTAMP)")
+    yield app, primary, replica
+    clear_genre_cache()
+
+
+def test_get_requests_read_from_the_replica(databases):
+    app, primary, replica = databases
+    assert 'The Replica Room' in app.test_client().get('/venues').get_data(as_text=True)
+
+
+def test_writes_go_to_the_primary_and_stick_the_session_to_it(databases):
+    app, primary, replica = databases
+    client = app.test_client()
+    client.post('/venues/create', data=VENUE)
+
+    assert count(primary, 'venue') == 1
+    assert count(replica, 'venue') == 1
+    # the writer reads its own write; other visitors still get the replica
+    assert 'The Primary Hall' in client.get('/venues').get_data(as_text=True)
+    assert 'The Primary Hall' not in app.test_client().get('/venues').get_data(as_text=True)
+
+
+def test_read_only_posts_do_not_stick_the_session(databases):
+    app, primary, replica = databases
+    client = app.test_client()
+    client.post('/venues/search', data={'search_term': 'hall'})
+
+    assert 'The Replica Room' in client.get('/venues').get_data(as_text=True)
+
+
+def test_cli_import_writes_everything_to_the_primary(databases, tmp_path):
+    app, primary, replica = databases
+    source = tmp_path / 'venues.csv'
+    source.write_text('name,city,state,address,phone,facebook_link,genres\n'
+                      'The Imported Club,Salem,OR,3 Main St,555-000-0001,https://www.facebook.com/club,"Jazz,Blues"\n')
+
+    result = app.test_cli_runner().invoke(args=[
+        'fyyur', 'import', 'venues', str(source), '--errors', str(tmp_path / 'rejected.ndjson')
+    ])
+
+    assert result.exit_code == 0, result.output
+    assert (count(primary, 'venue'), count(primary, 'venue_genre')) == (1, 2)
+    assert (count(replica, 'venue'), count(replica, 'venue_genre')) == (1, 0)
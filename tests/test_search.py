@@ -0,0 +1,98 @@
+import re
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from extensions import db
+from models import Venue
+from queries import search_results
+
+
+def result_ids(response):
+    return [int(id) for id in re.findall(r'href="/venues/(\d+)"', response.get_data(as_text=True))]
+
+
+def test_every_match_is_reachable_page_by_page(client, seeded):
+    seeded(venues=45, artists=5, shows=10)
+    seen = []
+    page = 1
+    while page:
+        response = client.post('/venues/search', data={'search_term': 'the', 'page': page})
+        text = response.get_data(as_text=True)
+        assert 'Number of search results for "the": 45' in text
+        seen += result_ids(response)
+        assert ('name="page" value="{}"'.format(page + 1) in text) == (page < 3)
+        page = page + 1 if page < 3 else None
+
+    assert sorted(seen) == list(range(1, 46))
+
+
+def test_single_page_has_no_page_controls(client, seeded):
+    seeded(venues=5, artists=5, shows=10)
+    text = client.post('/venues/search', data={'search_term': 'the'}).get_data(as_text=True)
+    assert 'name="page"' not in text
+
+
+@pytest.fixture
+def venues(app, db):
+    # app context with the venues below; yields a helper searching them
+    names = ['The Musical Hop', 'Park Square Live Music & Coffee', 'The Dueling Pianos Bar', 'Hop Scotch']
+    with app.app_context():
+        db.session.add_all(Venue(name=name, city='San Francisco', state='CA', address='1 Main St')
+                           for name in names)
+        db.session.commit()
+
+        def search(term, **kwargs):
+            return [venue['name'] for venue in search_results(Venue, term, **kwargs)['data']]
+        yield search
+        db.session.remove()
+
+
+@pytest.fixture
+def statements(app):
+    # the SQL statements run while the test is going
+    seen = []
+    listener = lambda conn, cursor, statement, *args: seen.append(statement)
+    event.listen(Engine, 'before_cursor_execute', listener)
+    yield seen
+    event.remove(Engine, 'before_cursor_execute', listener)
+
+
+def test_short_terms_use_like(venues, statements):
+    assert venues('OP') == ['Hop Scotch', 'The Musical Hop']
+    assert not any('MATCH' in statement for statement in statements)
+
+
+def test_longer_terms_use_the_fts_index(venues, statements):
+    assert sorted(venues('MUSIC')) == ['Park Square Live Music & Coffee', 'The Musical Hop']
+    assert venues('ano') == ['The Dueling Pianos Bar']
+    assert venues('"hop') == []
+    assert any('venue_fts MATCH' in statement for statement in statements)
+
+
+def test_fts_index_follows_renames_and_deletes(venues):
+    venue = Venue.query.filter_by(name='The Musical Hop').one()
+    venue.name = 'The Quiet Library'
+    db.session.commit()
+    assert venues('musical') == []
+    assert venues('library') == ['The Quiet Library']
+
+    db.session.delete(venue)
+    db.session.commit()
+    assert venues('library') == []
+    assert venues('hop') == ['Hop Scotch']
+
+
+def test_count_and_pages(app, seeded):
+    seeded(venues=45, artists=5, shows=10)
+    with app.app_context():
+        first = search_results(Venue, 'the', page=1)
+        last = search_results(Venue, 'the', page=3)
+        beyond = search_results(Venue, 'the', page=5)
+        nothing = search_results(Venue, 'no such venue')
+        clamped = search_results(Venue, 'the', page=0)
+
+    assert (first['count'], first['page'], first['pages'], len(first['data'])) == (45, 1, 3, 20)
+    assert (last['count'], last['page'], len(last['data'])) == (45, 3, 5)
+    assert (beyond['count'], beyond['data']) == (45, [])
+    assert (nothing['count'], nothing['pages'], nothing['data']) == (0, 0, [])
+    assert clamped['page'] == 1 and clamped['data'] == first['data']
@@ -0,0 +1,19 @@
+from tests.conftest import query_count, reset_schema
+
+
+def test_listing_statements_do_not_grow_with_venues(app, client, seeded):
+    seeded(venues=20, artists=20, shows=100)
+    few = query_count(client.get('/venues'))
+
+    # the same request against ten times the venues, on a fresh schema
+    reset_schema(app)
+    seeded(venues=200, artists=20, shows=1000)
+    many = query_count(client.get('/venues'))
+
+    assert few == many
+
+
+def test_listing_shows_every_venue(client, seeded):
+    seeded(venues=50, artists=10, shows=100)
+    page = client.get('/venues').get_data(as_text=True)
+    assert page.count('href="/venues/') == 50
@@ -0,0 +1,217 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app
+from cache import conditional
+from extensions import db, page_cache, query_stats, async_db
+from forms import VenueForm
+from models import Venue, venue_genre, utcnow
+from queries import venue_areas, search_results, get_with_genres, entity_shows, show_partner_ids, page_validators
+from genres import choice_ids, add_genres, set_genres
+from deletion import delete_venues
+import async_queries
+
+#----------------------------------------------------------------------------#
+# Venue pages.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('venues', __name__)
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues')
+@query_stats.budget(1)
+@page_cache.cached
+def venues():
+  if async_db.enabled:
+    data = async_db.run(async_queries.venue_areas())
+  else:
+    data = venue_areas()
+
+  return render_template('pages/venues.html', areas=data)
+
+@blueprint.route('/venues/search', methods=['POST'])
+@query_stats.budget(2)
+def search_venues():
+  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+  search_str = request.form.get('search_term', '')
+  page = request.values.get('page', 1, type=int)
+  response = search_results(Venue, search_str, page=page)
+
+  return render_template('pages/search_venues.html', results=response, search_term=search_str)
+
+@blueprint.route('/venues/<int:venue_id>')
+@query_stats.budget(6)
+@conditional(lambda venue_id: page_validators(Venue, venue_id))
+@page_cache.cached
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  # TODO: replace with real venue data from the venues table, using venue_id
+  
+  if async_db.enabled:
+    venue, genres, shows = async_db.run(async_queries.entity_page(Venue, venue_id))
+  else:
+    venue = get_with_genres(Venue, venue_id)
+    if venue:
+      genres = [genre.name for genre in venue.genres]
+      shows = entity_shows(Venue, venue.id)
+  data = {}
+  if venue:
+    data = {
+      "id": venue.id,
+      "name": venue.name,
+      "genres": genres,
+      "address": venue.address,
+      "city": venue.city,
+      "state": venue.state,
+      "phone": venue.phone,
+      "website": venue.website,
+      "facebook_link": venue.facebook_link,
+      "seeking_talent": True if venue.seeking_talent else False,
+      "image_link": venue.image_link,
+      **shows
+    }
+       
+  return render_template('pages/show_venue.html', venue=data)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@blueprint.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  # TODO: insert form data as a new Venue record in the db, instead
+  # TODO: modify data to be the data object returned from db insertion
+  form = VenueForm(request.form)
+  error = False
+  
+  # the form submits genre ids (see genres.genre_choices), so they're
+  # linked to the venue without looking genres up by name
+  try:
+      genre_ids = choice_ids(form.genres.data)
+      venue = Venue(
+        name = form.name.data,
+        city = form.city.data,
+        state = form.state.data,
+        address = form.address.data,
+        phone = form.phone.data,
+        image_link = form.image_link.data,
+        facebook_link = form.facebook_link.data,
+        seeking_talent = True if form.seeking_talent.data else False,
+        seeking_description = form.seeking_description.data,
+        website = form.website.data
+      )
+
+      db.session.add(venue)
+      db.session.flush()
+
+      add_genres(venue_genre, venue.id, genre_ids)
+      current_app.logger.debug('venue %s genres %s', venue.id, genre_ids)
+      db.session.commit()
+  except Exception:
+      db.session.rollback()
+      error = True
+      current_app.logger.exception('Venue %s could not be listed', form.name.data)
+  finally:
+      db.session.close()
+
+  # on successful db insert, flash success
+  #flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  if error:
+    flash('An error occurred. Venue ' + request.form['name']+ ' could not be listed.')
+  else:
+    page_cache.invalidate(url_for('venues.venues'))
+    flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  
+  return render_template('pages/home.html')
+
+@blueprint.route('/venues/<int:venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  # deletes the venue with its shows and genre links in one transaction
+  try:
+    deleted, artist_ids = delete_venues([venue_id])
+    if not deleted:
+      return jsonify({"success": False, "error": "not found"}), 404
+    db.session.commit()
+  except Exception:
+    db.session.rollback()
+    current_app.logger.exception('Venue %s could not be deleted', venue_id)
+    return jsonify({"success": False}), 500
+  finally:
+    db.session.close()
+
+  page_cache.invalidate(
+    url_for('venues.venues'),
+    url_for('venues.show_venue', venue_id=venue_id),
+    url_for('shows.shows'),
+    *[url_for('artists.show_artist', artist_id=id) for id in artist_ids]
+  )
+  return jsonify({"success": True})
+
+#  Update
+#  ----------------------------------------------------------------
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  form = VenueForm()
+  venue = Venue.query.get(venue_id)
+
+  if venue:
+    # populate form for loading the UI
+    form.name.data = venue.name
+    form.phone.data = venue.phone
+    form.state.data = venue.state
+    form.seeking_talent.data = venue.seeking_talent
+    form.seeking_description.data = venue.seeking_description
+    form.website.data = venue.website
+    form.address.data = venue.address
+    form.city.data = venue.city
+    form.facebook_link.data = venue.facebook_link
+    form.image_link.data = venue.image_link
+    form.genres.data = [genre.id for genre in venue.genres]
+  
+  # TODO: populate form with values from venue with ID <venue_id>
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  # TODO: take values from the form submitted, and update existing
+  # venue record with ID <venue_id> using the new attributes
+  form = VenueForm(request.form)
+  venue = Venue.query.get(venue_id)
+
+  if venue:
+    genre_ids = choice_ids(form.genres.data)
+    # update venue object with form data
+    venue.name = form.name.data
+    venue.city = form.city.data
+    venue.state = form.state.data
+    venue.address = form.address.data
+    venue.phone = form.phone.data
+    venue.image_link = form.image_link.data
+    venue.facebook_link = form.facebook_link.data
+    venue.seeking_talent = form.seeking_talent.data
+    venue.seeking_description = form.seeking_description.data
+    venue.website = form.website.data
+
+    # only insert/delete the venue_genre rows that changed, and skip the
+    # UPDATE and commit entirely when the save changes nothing
+    venue_changed = db.session.is_modified(venue)
+    if set_genres(venue_genre, venue.id, genre_ids) or venue_changed:
+      # genre changes alone don't trigger onupdate
+      venue.updated_at = utcnow()
+      db.session.commit()
+      page_cache.invalidate(
+        url_for('venues.venues'),
+        url_for('venues.show_venue', venue_id=venue_id),
+        url_for('shows.shows'),
+        *[url_for('artists.show_artist', artist_id=id) for id in show_partner_ids(Venue, venue_id)]
+      )
+    
+  return redirect(url_for('venues.show_venue', venue_id=venue_id))
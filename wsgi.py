@@ -0,0 +1,5 @@
+# gunicorn entry point: gunicorn wsgi:app
+# web workers skip the CLI-only setup (Flask-Migrate/alembic, flask fyyur)
+from app import create_app
+
+app = create_app(cli=False)